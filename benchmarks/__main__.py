@@ -0,0 +1,15 @@
+"""
+Offline benchmark suite.
+
+    python -m benchmarks                       # everything, JSON report on stdout
+    python -m benchmarks dal. -o new.json      # only the DAL benchmarks
+    python -m benchmarks --compare old.json    # exit 1 if anything got slower than --threshold
+
+Progress goes to stderr, the JSON report to stdout or --output. Database
+benchmarks run against seeded SQLite files in a temp directory, the
+verifier runs against the recorded explorer answers in benchmarks/fixtures.
+"""
+from benchmarks import bench_database, bench_verifier, bench_display  # noqa: F401 - registers the benchmarks
+from benchmarks.harness import main
+
+main()
@@ -0,0 +1,118 @@
+import itertools
+import os
+import tempfile
+import time
+
+import functions.database as database
+from benchmarks.harness import Case, benchmark
+from config import SUPREME_USER
+
+_tmpdir = tempfile.TemporaryDirectory(prefix="slotbot-bench-")
+GUILD_ID = 1
+
+
+def use_database(name: str, slots: int = 0, users: int = 0, transactions: int = 0) -> str:
+    """Point the DAL at a fresh SQLite file in the temp directory, seeded with the given row counts."""
+    path = os.path.join(_tmpdir.name, f"{name}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    database.close_connection()
+    database.DATABASE_PATH = path
+    database.TRX_IDS_FILE = os.path.join(_tmpdir.name, "trx_ids.json")
+    database.setup_tables()
+
+    with database.db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO slots (id, guild_id, points, default_name) VALUES (?, ?, 100, ?)",
+            ((slot_id, GUILD_ID, f"slot-{slot_id}") for slot_id in range(1, slots + 1))
+        )
+        cursor.executemany(
+            "INSERT INTO users (guild_id, id, points) VALUES (?, ?, 1000000)",
+            ((GUILD_ID, user_id) for user_id in range(1, users + 1))
+        )
+        cursor.executemany(
+            "INSERT INTO used_transactions (chain, tx_id, claimed_at) VALUES ('BTC', ?, 0)",
+            ((f"{n:064x}",) for n in range(transactions))
+        )
+    return path
+
+
+@benchmark("dal.get_points", users=[10, 10000])
+def get_points(users):
+    use_database("get_points", users=users)
+    return Case(lambda i: database.get_points(guild_id=GUILD_ID, id=i % users + 1))
+
+
+@benchmark("dal.user_admin", users=[10, 10000])
+def user_admin(users):
+    use_database("user_admin", users=users)
+    return Case(lambda i: database.user_admin(guild_id=GUILD_ID, id=i % users + 1))
+
+
+@benchmark("dal.user_admin_supreme")
+def user_admin_supreme():
+    return Case(lambda i: database.user_admin(guild_id=GUILD_ID, id=SUPREME_USER))
+
+
+@benchmark("dal.get_slot_info", slots=[10, 1000, 10000])
+def get_slot_info(slots):
+    use_database("get_slot_info", slots=slots)
+    return Case(lambda i: database.get_slot_info(i % slots + 1))
+
+
+@benchmark("dal.get_all_slots", slots=[10, 1000, 10000])
+def get_all_slots(slots):
+    use_database("get_all_slots", slots=slots)
+    return Case(lambda i: database.get_all_slots())
+
+
+@benchmark("dal.purchase_slot", slots=[10, 1000, 10000])
+def purchase_slot(slots):
+    # Slot i is bought by user i, every round starts with all slots free
+    use_database("purchase_slot", slots=slots, users=slots)
+
+    def reset():
+        with database.db_connection() as conn:
+            conn.execute("UPDATE slots SET occupied = 0, occupied_by = 0, occupied_till = 0")
+
+    def op(i):
+        result = database.purchase_slot(i + 1, i + 1, 3600, 100)
+        assert result.ok, result
+
+    return Case(op, reset=reset, limit=slots)
+
+
+@benchmark("dal.purchase_slot_contended", slots=[10, 10000])
+def purchase_slot_contended(slots):
+    # Every attempt hits an occupied slot, the cost of a rejected purchase
+    use_database("purchase_slot_contended", slots=slots, users=slots)
+    with database.db_connection() as conn:
+        conn.execute("UPDATE slots SET occupied = 1, occupied_by = 0, occupied_till = ?", (int(time.time()) + 3600,))
+    return Case(lambda i: database.purchase_slot(i % slots + 1, i % slots + 1, 3600, 100))
+
+
+@benchmark("dal.save_trx_id", transactions=[1000, 100000])
+def save_trx_id(transactions):
+    use_database("save_trx_id", transactions=transactions)
+    counter = itertools.count()
+    return Case(lambda i: database.save_trx_id(f"new-{next(counter)}", "BTC"))
+
+
+@benchmark("dal.is_transaction_id_used", transactions=[1000, 100000])
+def is_transaction_id_used(transactions):
+    use_database("is_transaction_id_used", transactions=transactions)
+    return Case(lambda i: database.is_transaction_id_used(f"{i % transactions:064x}", "BTC"))
+
+
+@benchmark("dal.async_get_points", users=[10000])
+def async_get_points(users):
+    # Same query as dal.get_points, plus the hop to the database thread
+    use_database("async_get_points", users=users)
+    db = database.AsyncDatabase()
+
+    async def op(i):
+        await db.get_points(guild_id=GUILD_ID, id=i % users + 1)
+
+    return Case(op, teardown=db.close)
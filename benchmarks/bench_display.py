@@ -0,0 +1,52 @@
+from benchmarks.harness import Case, benchmark
+from config import CRYPTO_ADDRESSES
+from functions.display import RoutedView, PointPurchaseButton, SlotInfoView, TicketView
+from functions.render import RenderCache, render_cache
+from extensions.Point import SlotClaimedView, SlotDurationView
+
+
+@benchmark("display.shop_embed", cached=[True, False])
+def shop_embed(cached):
+    if cached:
+        return Case(lambda i: render_cache.shop_embed())
+    return Case(lambda i: RenderCache().shop_embed())
+
+
+@benchmark("display.duration_options", cached=[True, False])
+def duration_options(cached):
+    if cached:
+        return Case(lambda i: render_cache.duration_options(100))
+    return Case(lambda i: RenderCache().duration_options(100))
+
+
+@benchmark("display.embed_to_dict")
+def embed_to_dict():
+    embed = render_cache.ticket_embed()
+    return Case(lambda i: embed.to_dict())
+
+
+# Views need a running event loop, which the harness provides
+@benchmark("display.ticket_view")
+def ticket_view():
+    return Case(lambda i: TicketView(i, CRYPTO_ADDRESSES).to_components())
+
+
+@benchmark("display.slot_duration_view")
+def slot_duration_view():
+    return Case(lambda i: SlotDurationView(i, 100).to_components())
+
+
+@benchmark("display.slot_claimed_view")
+def slot_claimed_view():
+    return Case(lambda i: SlotClaimedView(i).to_components())
+
+
+@benchmark("display.points_shop_view")
+def points_shop_view():
+    return Case(lambda i: RoutedView(PointPurchaseButton()).to_components())
+
+
+@benchmark("display.slot_info_view", slots=[1, 25])
+def slot_info_view(slots):
+    rows = [(slot_id, 100, f"slot-{slot_id}", 0) for slot_id in range(1, slots + 1)]
+    return Case(lambda i: SlotInfoView(rows).to_components())
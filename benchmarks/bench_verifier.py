@@ -0,0 +1,122 @@
+import contextlib
+import io
+import json
+import os
+import time
+
+from benchmarks.bench_database import use_database
+from benchmarks.harness import Case, benchmark
+from config import CRYPTO_ADDRESSES
+from functions.blockchain import BlockchainVerifier, PriceOracle
+from functions.database import db
+from functions.verification import VerificationPool
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# crypto_type -> (fixture, spot price seeded into the oracle, expected amount in USD)
+CHAINS = {
+    "Bitcoin": ("btc_transaction.json", 60000.0, 10.0),
+    "Litecoin": ("ltc_transaction.json", 80.0, 10.0),
+    "Ethereum": ("eth_transaction.json", None, 10.0)
+}
+
+
+def load_fixture(crypto_type: str) -> str:
+    """Explorer answer for `crypto_type` with the configured receiving address filled in."""
+    fixture = CHAINS[crypto_type][0]
+    with open(os.path.join(FIXTURES, fixture), "r") as file:
+        return file.read().replace("__ADDRESS__", CRYPTO_ADDRESSES[crypto_type]["address"])
+
+
+@benchmark("verifier.decode", crypto_type=list(CHAINS))
+def decode(crypto_type):
+    body = load_fixture(crypto_type)
+    return Case(lambda i: json.loads(body))
+
+
+@benchmark("verifier.verify_transaction", crypto_type=list(CHAINS))
+def verify_transaction(crypto_type):
+    # The answer and the spot price are served from their caches, so this is
+    # the dispatch, cache lookup and response walk without any network I/O
+    _, price, expected_amount = CHAINS[crypto_type]
+    network = CRYPTO_ADDRESSES[crypto_type]["network"]
+    data = json.loads(load_fixture(crypto_type))
+    tx_id = f"bench-{network}"
+
+    def reset():
+        BlockchainVerifier.transaction_cache.put((network, tx_id), data, 86400)
+        if price is not None:
+            PriceOracle._quotes[network] = (price, time.monotonic())
+
+    async def op(i):
+        # The verifier prints while walking outputs, keep that out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            verified = await BlockchainVerifier.verify_transaction(crypto_type, tx_id, expected_amount)
+        assert verified, crypto_type
+
+    return Case(op, reset=reset)
+
+
+@benchmark("verifier.btc_mempool")
+def btc_mempool():
+    # A broadcast but unmined transaction must stay pending: short cache TTL, not verified
+    with open(os.path.join(FIXTURES, "btc_mempool_transaction.json"), "r") as file:
+        data = json.loads(file.read().replace("__ADDRESS__", CRYPTO_ADDRESSES["Bitcoin"]["address"]))
+    assert not BlockchainVerifier._btc_confirmed(data)
+    assert BlockchainVerifier._btc_confirmed(json.loads(load_fixture("Bitcoin")))
+    _, price, expected_amount = CHAINS["Bitcoin"]
+    tx_id = "bench-btc-mempool"
+
+    def reset():
+        BlockchainVerifier.transaction_cache.put(("BTC", tx_id), data, 86400)
+        PriceOracle._quotes["BTC"] = (price, time.monotonic())
+
+    async def op(i):
+        with contextlib.redirect_stdout(io.StringIO()):
+            verified = await BlockchainVerifier.verify_transaction("Bitcoin", tx_id, expected_amount)
+        assert not verified
+
+    return Case(op, reset=reset)
+
+
+@benchmark("verifier.pool_check")
+async def pool_check():
+    # One background check of a real 'verifying' ticket row, the explorer answer served from the cache
+    crypto_type = "Bitcoin"
+    _, price, expected_amount = CHAINS[crypto_type]
+    network = CRYPTO_ADDRESSES[crypto_type]["network"]
+    data = json.loads(load_fixture(crypto_type))
+    tx_id = "bench-pool-check"
+
+    use_database("pool_check")
+    await db.close_connection()     # The database thread reopens DATABASE_PATH
+    await db.create_ticket_tables()
+    ticket_id = await db.create_ticket(1, 1, 1)
+    assert await db.start_ticket_verification(ticket_id, 100, expected_amount, crypto_type, tx_id)
+
+    results = []
+
+    async def on_result(ticket, verified):
+        results.append(verified)
+
+    pool = VerificationPool(on_result)
+
+    def reset():
+        BlockchainVerifier.transaction_cache.put((network, tx_id), data, 86400)
+        PriceOracle._quotes[network] = (price, time.monotonic())
+
+    async def op(i):
+        with contextlib.redirect_stdout(io.StringIO()):
+            await pool._check(ticket_id)
+        assert results.pop() is True, ticket_id
+
+    return Case(op, reset=reset)
+
+
+@benchmark("verifier.transaction_cache", entries=[1024])
+def transaction_cache(entries):
+    from functions.blockchain import TransactionCache
+    cache = TransactionCache(entries)
+    for n in range(entries):
+        cache.put(("BTC", str(n)), n, 86400)
+    return Case(lambda i: cache.get(("BTC", str(i % entries))))
@@ -0,0 +1,167 @@
+import asyncio
+import inspect
+import itertools
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARKS = []
+
+
+class Case:
+    """
+    One prepared benchmark.
+    `op(i)` runs iteration i (sync or async). `reset()` runs before every
+    round, untimed, for cases that consume state such as free slots. `limit`
+    caps the iterations per round for those cases, and `teardown()` runs once
+    all rounds are done.
+    """
+
+    def __init__(self, op, reset=None, limit: int = None, teardown=None):
+        self.op = op
+        self.reset = reset
+        self.limit = limit
+        self.teardown = teardown
+
+
+def benchmark(name: str, **params):
+    """
+    Register a benchmark factory. Every keyword takes a list of values and the
+    factory is called once per combination, e.g. `slots=[10, 1000, 10000]`.
+    The factory returns a Case and may be a coroutine function.
+    """
+    def register(factory):
+        keys = list(params)
+        for values in itertools.product(*(params[key] for key in keys)):
+            BENCHMARKS.append((name, dict(zip(keys, values)), factory))
+        return factory
+    return register
+
+
+async def _time_round(case: Case, number: int) -> float:
+    if case.reset:
+        result = case.reset()
+        if inspect.isawaitable(result):
+            await result
+    op = case.op
+    if inspect.iscoroutinefunction(op):
+        started = time.perf_counter()
+        for i in range(number):
+            await op(i)
+        return time.perf_counter() - started
+    started = time.perf_counter()
+    for i in range(number):
+        op(i)
+    return time.perf_counter() - started
+
+
+async def measure(case: Case, rounds: int, min_time: float) -> dict:
+    # Grow the iterations per round until one round takes at least min_time
+    number = 1
+    while True:
+        elapsed = await _time_round(case, number)
+        if elapsed >= min_time or (case.limit and number >= case.limit):
+            break
+        number = number * 10 if elapsed < min_time / 10 else number * 2
+        if case.limit:
+            number = min(number, case.limit)
+
+    timings = [await _time_round(case, number) / number for _ in range(rounds)]
+    median = statistics.median(timings)
+    return {
+        "number": number,
+        "rounds": rounds,
+        "min_ns": round(min(timings) * 1e9, 1),
+        "median_ns": round(median * 1e9, 1),
+        "mean_ns": round(statistics.mean(timings) * 1e9, 1),
+        "stdev_ns": round(statistics.stdev(timings) * 1e9, 1) if rounds > 1 else 0.0,
+        "ops_per_sec": round(1 / median, 1) if median else None
+    }
+
+
+async def run(selected: list = None, rounds: int = 5, min_time: float = 0.05) -> list:
+    results = []
+    for name, params, factory in BENCHMARKS:
+        if selected and not any(name.startswith(prefix) for prefix in selected):
+            continue
+        case = factory(**params)
+        if inspect.isawaitable(case):
+            case = await case
+        try:
+            stats = await measure(case, rounds, min_time)
+        finally:
+            if case.teardown:
+                result = case.teardown()
+                if inspect.isawaitable(result):
+                    await result
+        results.append({"name": name, "params": params, **stats})
+        print(f"{name:<36} {format_params(params):<20} {stats['median_ns'] / 1000:>12.2f} µs/op {stats['ops_per_sec']:>14,.0f} op/s", file=sys.stderr)
+    return results
+
+
+def format_params(params: dict) -> str:
+    return " ".join(f"{key}={value}" for key, value in params.items())
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "timestamp": int(time.time())
+    }
+
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    """Return [(name, params, old_ns, new_ns), ...] for results slower than the baseline by more than `threshold`."""
+    old = {(entry["name"], json.dumps(entry["params"], sort_keys=True)): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        previous = old.get((entry["name"], json.dumps(entry["params"], sort_keys=True)))
+        if previous and entry["median_ns"] > previous["median_ns"] * (1 + threshold):
+            regressions.append((entry["name"], entry["params"], previous["median_ns"], entry["median_ns"]))
+    return regressions
+
+
+def main(argv: list = None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("benchmarks", nargs="*", help="only run benchmarks whose name starts with one of these")
+    parser.add_argument("--output", "-o", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown against the baseline (default 0.10)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum duration of one round (in seconds)")
+    parser.add_argument("--quick", action="store_true", help="3 short rounds, for a smoke run")
+    args = parser.parse_args(argv)
+
+    rounds, min_time = (3, 0.01) if args.quick else (args.rounds, args.min_time)
+    results = asyncio.run(run(args.benchmarks, rounds, min_time))
+    report = {"environment": environment(), "settings": {"rounds": rounds, "min_time": min_time}, "results": results}
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(payload + "\n")
+    else:
+        print(payload)
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for name, params, old_ns, new_ns in regressions:
+            print(f"REGRESSION {name} {format_params(params)}: {old_ns / 1000:.2f} µs -> {new_ns / 1000:.2f} µs", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
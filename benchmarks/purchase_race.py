@@ -0,0 +1,120 @@
+"""
+Concurrency test for slot purchases in functions/database.py.
+
+    python -m benchmarks.purchase_race
+    python -m benchmarks.purchase_race --slots 20 --users 200 --attempts 600
+
+Every attempt gets its own thread (and so its own SQLite connection), the
+threads wait on a barrier and then all call purchase_slot at once. Afterwards
+exactly one purchase per slot must have gone through, no buyer may hold two
+slots, and exactly sold x price points must have left the users' balances.
+Exits 1 if any check fails.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+import functions.database as database
+
+GUILD_ID = 1
+
+
+def seed(path: str, slots: int, users: int, starting_points: int, price: int):
+    database.close_connection()
+    database.DATABASE_PATH = path
+    database.TRX_IDS_FILE = os.path.join(os.path.dirname(path), "trx_ids.json")
+    database.setup_tables()
+    with database.db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO slots (id, guild_id, points, default_name) VALUES (?, ?, ?, ?)",
+            ((slot_id, GUILD_ID, price, f"slot-{slot_id}") for slot_id in range(1, slots + 1))
+        )
+    for user_id in range(1, users + 1):
+        database.add_points(guild_id=GUILD_ID, id=user_id, points=starting_points, reason="race_seed")
+
+
+def race(args) -> tuple:
+    """Fire every attempt at once, returns ({status: count}, successful (slot_id, user_id) purchases)."""
+    rng = random.Random(args.seed)
+    # Every slot gets the same share of attempts, from random buyers
+    attempts = [(attempt % args.slots + 1, rng.randint(1, args.users)) for attempt in range(args.attempts)]
+    barrier = threading.Barrier(len(attempts))
+    lock = threading.Lock()
+    statuses, purchases = Counter(), []
+
+    def attempt(slot_id: int, user_id: int):
+        barrier.wait()
+        result = database.purchase_slot(slot_id, user_id, 3600, args.price)
+        database.close_connection()
+        with lock:
+            statuses[result.status] += 1
+            if result.ok:
+                purchases.append((slot_id, user_id))
+
+    threads = [threading.Thread(target=attempt, args=pair) for pair in attempts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses, purchases
+
+
+def check(args, purchases: list) -> dict:
+    """Number of violations per check, all 0 when purchases were serialized correctly."""
+    cursor = database.db_connection().cursor()
+
+    cursor.execute("SELECT COUNT(*) FROM slots WHERE occupied = 1")
+    occupied = cursor.fetchone()[0]
+
+    cursor.execute("""
+        SELECT COUNT(*) FROM (
+            SELECT occupied_by FROM slots WHERE occupied = 1
+            GROUP BY guild_id, occupied_by HAVING COUNT(*) > 1
+        )
+    """)
+    users_with_several_slots = cursor.fetchone()[0]
+
+    cursor.execute("SELECT SUM(points) FROM users WHERE guild_id = ?", (GUILD_ID,))
+    deducted = args.users * args.starting_points - cursor.fetchone()[0]
+
+    slots_sold = Counter(slot_id for slot_id, _ in purchases)
+    return {
+        "slots_not_sold": args.slots - occupied,
+        "slots_sold_twice": sum(count - 1 for count in slots_sold.values() if count > 1),
+        "purchases_not_occupying": len(purchases) - occupied,
+        "users_with_several_slots": users_with_several_slots,
+        "points_deducted_mismatch": abs(deducted - len(purchases) * args.price),
+        "ledger_mismatches": len(database.audit_points())
+    }
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Fire hundreds of simultaneous slot purchases and check none was double sold")
+    parser.add_argument("--slots", type=int, default=20)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--attempts", type=int, default=600, help="purchases fired at once, one thread each")
+    parser.add_argument("--price", type=int, default=10, help="points per purchase")
+    parser.add_argument("--starting-points", type=int, default=25, help="enough for two purchases, so a second slot is only stopped by the one-slot rule")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="slotbot-race-") as tmpdir:
+        seed(os.path.join(tmpdir, "race.db"), args.slots, args.users, args.starting_points, args.price)
+        statuses, purchases = race(args)
+        results = check(args, purchases)
+        database.close_connection()
+
+    print("outcomes: " + ", ".join(f"{status} {count}" for status, count in sorted(statuses.items())), file=sys.stderr)
+    for name, count in results.items():
+        print(f"{'FAIL' if count else 'ok  '} {name}: {count}", file=sys.stderr)
+    if statuses.get("error") or any(results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Contention stress test for functions/database.py.
+
+    python -m benchmarks.stress --processes 4 --threads 4 --duration 10
+    python -m benchmarks.stress --mix purchase=50,ping=20,expire=10,grant=15,claim=5 -o stress.json
+
+N processes with M threads each hammer one SQLite file with a weighted mix
+of slot purchases, ping updates, expiry resets, point grants and payment
+claims. The report gives throughput, p50/p99 latency and outcome counts per
+operation, the errors the DAL swallowed (`locked` is "database is locked"),
+and the invariants checked afterwards. Exits 1 if any invariant is violated.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import functions.database as database
+
+OPERATIONS = ("purchase", "ping", "expire", "grant", "claim")
+DEFAULT_MIX = "purchase=40,ping=25,expire=10,grant=20,claim=5"
+SLOT_PRICE = 10
+GUILD_ID = 1
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}, expected one of {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def use_database(path: str):
+    database.close_connection()
+    database.DATABASE_PATH = path
+    database.TRX_IDS_FILE = os.path.join(os.path.dirname(path), "trx_ids.json")
+
+
+def seed(path: str, slots: int, users: int, starting_points: int):
+    use_database(path)
+    database.setup_tables()
+    with database.db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO slots (id, guild_id, points, default_name) VALUES (?, ?, ?, ?)",
+            ((slot_id, GUILD_ID, SLOT_PRICE, f"slot-{slot_id}") for slot_id in range(1, slots + 1))
+        )
+    for user_id in range(1, users + 1):
+        database.add_points(guild_id=GUILD_ID, id=user_id, points=starting_points, reason="stress_seed")
+    database.close_connection()
+
+
+class Recorder:
+    """What one thread saw: latencies and outcomes per operation, successful purchases and claims."""
+
+    def __init__(self):
+        self.latencies = {name: [] for name in OPERATIONS}
+        self.outcomes = Counter()
+        self.purchases = []     # (slot_id, started_at, occupied_till)
+        self.claims = Counter()  # tx_id -> successful claims
+
+
+def run_thread(args, seed_value: int, deadline: float, recorder: Recorder):
+    rng = random.Random(seed_value)
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    slot_ids = range(1, args.slots + 1)
+
+    while time.time() < deadline:
+        name = rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        if name == "purchase":
+            slot_id, user_id = rng.choice(slot_ids), rng.randint(1, args.users)
+            duration = rng.randint(1, args.max_rental)
+            result = database.purchase_slot(slot_id, user_id, duration, SLOT_PRICE)
+            outcome = result.status
+            if result.ok:
+                recorder.purchases.append((slot_id, result.occupied_till - duration, result.occupied_till))
+        elif name == "ping":
+            outcome = database.update_slot_pings(rng.choice(slot_ids), rng.randint(0, 5))
+        elif name == "expire":
+            outcome = database.expire_slots(rng.sample(slot_ids, min(10, args.slots)), int(time.time()))
+        elif name == "grant":
+            outcome = database.add_points(guild_id=GUILD_ID, id=rng.randint(1, args.users), points=rng.randint(1, 50), reason="stress_grant")
+        else:
+            tx_id = f"stress-{rng.randrange(args.transactions)}"
+            try:
+                outcome = database.claim_transaction("BTC", tx_id, GUILD_ID, rng.randint(1, args.users), 25)
+            except Exception as e:
+                outcome = type(e).__name__
+            if outcome is True:
+                recorder.claims[tx_id] += 1
+        recorder.latencies[name].append(time.perf_counter() - started)
+        recorder.outcomes[(name, str(outcome))] += 1
+
+
+def run_process(index: int, path: str, args, deadline: float, queue):
+    use_database(path)
+    recorders = [Recorder() for _ in range(args.threads)]
+    threads = [
+        threading.Thread(target=run_thread, args=(args, args.seed * 1000 + index * 100 + n, deadline, recorders[n]))
+        for n in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    merged = Recorder()
+    for recorder in recorders:
+        for name in OPERATIONS:
+            merged.latencies[name].extend(recorder.latencies[name])
+        merged.outcomes.update(recorder.outcomes)
+        merged.purchases.extend(recorder.purchases)
+        merged.claims.update(recorder.claims)
+    queue.put({
+        "latencies": merged.latencies,
+        "outcomes": [(name, outcome, count) for (name, outcome), count in merged.outcomes.items()],
+        "errors": [(operation, kind, count) for (operation, kind), count in database.error_counts.items()],
+        "purchases": merged.purchases,
+        "claims": dict(merged.claims)
+    })
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def check_invariants(path: str, purchases: list, claims: Counter) -> dict:
+    use_database(path)
+    conn = database.db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT COUNT(*) FROM users WHERE points < 0")
+    negative_balances = cursor.fetchone()[0]
+
+    cursor.execute("""
+        SELECT COUNT(*) FROM (
+            SELECT occupied_by FROM slots WHERE occupied = 1
+            GROUP BY guild_id, occupied_by HAVING COUNT(*) > 1
+        )
+    """)
+    users_with_several_slots = cursor.fetchone()[0]
+
+    # A slot may only be sold again after the previous rental ended
+    overlapping_rentals = 0
+    by_slot = {}
+    for slot_id, started_at, occupied_till in purchases:
+        by_slot.setdefault(slot_id, []).append((started_at, occupied_till))
+    for rentals in by_slot.values():
+        rentals.sort()
+        for previous, current in zip(rentals, rentals[1:]):
+            if current[0] < previous[1]:
+                overlapping_rentals += 1
+
+    cursor.execute("""
+        SELECT COUNT(*) FROM (
+            SELECT reference FROM points_ledger WHERE reason = 'payment'
+            GROUP BY reference HAVING COUNT(*) > 1
+        )
+    """)
+    double_credited = max(cursor.fetchone()[0], sum(1 for count in claims.values() if count > 1))
+
+    return {
+        "negative_balances": negative_balances,
+        "users_with_several_slots": users_with_several_slots,
+        "overlapping_rentals": overlapping_rentals,
+        "double_credited_transactions": double_credited,
+        "ledger_mismatches": len(database.audit_points())
+    }
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Stress the SQLite layer from several processes at once")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4, help="threads per process")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--slots", type=int, default=50)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--starting-points", type=int, default=100)
+    parser.add_argument("--transactions", type=int, default=500, help="size of the shared pool of transaction IDs to claim")
+    parser.add_argument("--max-rental", type=int, default=3, help="longest rental bought (in seconds)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="database file to use (default: a fresh temp file)")
+    parser.add_argument("--output", "-o", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    if args.db:
+        path = args.db
+    else:
+        tmpdir = tempfile.TemporaryDirectory(prefix="slotbot-stress-")
+        path = os.path.join(tmpdir.name, "stress.db")
+    seed(path, args.slots, args.users, args.starting_points)
+
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    started = time.time()
+    deadline = started + args.duration
+    processes = [
+        context.Process(target=run_process, args=(index, path, args, deadline, queue))
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    reports = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.time() - started
+
+    latencies = {name: [] for name in OPERATIONS}
+    outcomes, errors, claims, purchases = Counter(), Counter(), Counter(), []
+    for report in reports:
+        for name in OPERATIONS:
+            latencies[name].extend(report["latencies"][name])
+        for name, outcome, count in report["outcomes"]:
+            outcomes[(name, outcome)] += count
+        for operation, kind, count in report["errors"]:
+            errors[(operation, kind)] += count
+        claims.update(report["claims"])
+        purchases.extend(report["purchases"])
+
+    operations = {}
+    for name in OPERATIONS:
+        samples = latencies[name]
+        if not samples:
+            continue
+        operations[name] = {
+            "count": len(samples),
+            "throughput": round(len(samples) / elapsed, 1),
+            "p50_ms": round(statistics.median(samples) * 1000, 3),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+            "max_ms": round(max(samples) * 1000, 3),
+            "outcomes": {outcome: count for (op, outcome), count in sorted(outcomes.items()) if op == name}
+        }
+    invariants = check_invariants(path, purchases, claims)
+    total = sum(len(samples) for samples in latencies.values())
+
+    report = {
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "db")},
+        "elapsed": round(elapsed, 2),
+        "throughput": round(total / elapsed, 1),
+        "operations": operations,
+        "errors": [{"operation": operation, "kind": kind, "count": count} for (operation, kind), count in sorted(errors.items())],
+        "locked": sum(count for (_, kind), count in errors.items() if kind == "locked"),
+        "invariants": invariants
+    }
+
+    for name, stats in operations.items():
+        print(f"{name:<10} {stats['count']:>8} ops {stats['throughput']:>10.1f} op/s  p50 {stats['p50_ms']:>8.3f} ms  p99 {stats['p99_ms']:>8.3f} ms", file=sys.stderr)
+    print(f"total      {total:>8} ops {report['throughput']:>10.1f} op/s  locked {report['locked']}", file=sys.stderr)
+    for name, count in invariants.items():
+        print(f"{'FAIL' if count else 'ok  '} {name}: {count}", file=sys.stderr)
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(payload + "\n")
+    else:
+        print(payload)
+
+    if tmpdir:
+        database.close_connection()
+        tmpdir.cleanup()
+    if any(invariants.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
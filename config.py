@@ -1,4 +1,14 @@
 DATABASE_PATH = "./databases/database.db"
+
+# SQLite storage profile, applied once to every new connection
+STORAGE_PROFILE = {
+    "journal_mode": "WAL",          # Readers no longer block on the writer
+    "synchronous": "NORMAL",        # Safe with WAL, skips an fsync per commit
+    "cache_size": -16000,           # Page cache size (negative means KiB, so ~16 MB)
+    "mmap_size": 134217728,         # Memory-map up to 128 MB of the database file
+    "busy_timeout": 5000,           # Wait up to 5s for a lock instead of failing (in milliseconds)
+    "cached_statements": 256        # Prepared statements kept per connection
+}
 SUPREME_USER = 874033979504873512  # Replace with your ID
 
 # Slot duration configurations
@@ -84,6 +94,32 @@ API_KEYS = {
     "SOLSCAN_API_KEY": "YOUR_SOLSCAN_API_KEY"  # Add your Solscan API key
 }
 
+# HTTP client settings for the blockchain explorers
+HTTP_SETTINGS = {
+    "request_timeout": 15,          # Total time allowed for one explorer request (in seconds)
+    "connect_timeout": 5,           # Time allowed to open a connection (in seconds)
+    "pool_size": 100,               # Maximum open connections overall
+    "pool_size_per_host": 10,       # Maximum open connections per explorer
+    "dns_cache_ttl": 300,           # How long resolved hostnames are cached (in seconds)
+    "keepalive_timeout": 30         # How long idle connections are kept open (in seconds)
+}
+
+# Cached BTC/LTC spot prices used when verifying payments
+PRICE_ORACLE_SETTINGS = {
+    "ttl": 60,                      # How long a quote is considered fresh (in seconds)
+    "refresh_ahead": 10,            # Refresh in the background this long before a quote expires (in seconds)
+    "fetch_timeout": 3,             # How long to wait for the provider before serving a stale quote (in seconds)
+    "max_stale": 600                # Never serve a quote older than this (in seconds)
+}
+
+# Cache of explorer answers, so retried or re-checked transactions skip the network
+TRANSACTION_CACHE_SETTINGS = {
+    "max_entries": 1024,            # Least recently used entries are dropped past this size
+    "confirmed_ttl": 86400,         # Confirmed transactions no longer change (in seconds)
+    "pending_ttl": 15,              # Unconfirmed transactions are looked up again after this (in seconds)
+    "not_found_ttl": 5              # "Not found" answers are remembered this long (in seconds)
+}
+
 # Default verification settings
 VERIFICATION_SETTINGS = {
     "check_amount": True,           # Whether to verify the exact amount
@@ -91,12 +127,56 @@ VERIFICATION_SETTINGS = {
     "auto_approve": False,          # Whether to automatically approve verified transactions
     "max_wait_time": 3600,          # Maximum time to wait for confirmation (in seconds)
     "retry_interval": 60,           # How often to retry verification (in seconds)
-    "max_retries": 60               # Maximum number of retries before giving up
+    "max_retries": 60,              # Maximum number of retries before giving up
+    "workers": 4                    # Number of verifications running at the same time
+}
+
+# Points ledger checkpoints
+LEDGER_SETTINGS = {
+    "checkpoint_interval": 3600     # How often every balance is snapshotted (in seconds)
+}
+
+# Outbound Discord calls (channel renames, message edits) made in the background
+REST_SETTINGS = {
+    "rename_limit": 2,              # Channel renames Discord allows per channel per window
+    "rename_window": 600,           # Length of the rename window (in seconds)
+    "concurrency": 10               # Calls running at the same time across all channels
+}
+
+# Gateway sharding (shard_ids needs shard_count to be set)
+SHARD_SETTINGS = {
+    "shard_count": None,            # None lets Discord recommend the number of shards
+    "shard_ids": None               # Shards run by this process, None runs all of them
+}
+
+# Prometheus metrics endpoint, started with the bot
+METRICS_SETTINGS = {
+    "enabled": True,
+    "host": "127.0.0.1",            # Only reachable from this machine by default
+    "port": 9108                    # Scrape http://host:port/metrics
+}
+
+# On-demand profiler (/profile)
+PROFILER_SETTINGS = {
+    "max_duration": 60,             # Longest profile that can be requested (in seconds)
+    "interval": 0.005,              # Event loop stack sampled every 5ms
+    "task_interval": 0.1            # asyncio tasks sampled every 100ms
+}
+
+# Event loop watchdog
+WATCHDOG_SETTINGS = {
+    "interval": 0.1,                # Heartbeat interval (in seconds)
+    "threshold": 0.5,               # Loop blocked this long counts as a stall (in seconds)
+    "history": 50                   # Recent stalls kept for /stalls
 }
 
 # Slot configurations
 SLOT_CONFIG = {
     "default_pings": 3,             # Default number of pings when slot is purchased
     "points_per_hour": 100,         # Points cost per hour of slot rental
-    "default_name": "Available Slot" # Default name for available slots
-}
\ No newline at end of file
+    "default_name": "Available Slot", # Default name for available slots
+    "reconcile_concurrency": 5      # Slot channels checked at the same time on startup
+}
+
+# Guild that owns data stored before per-guild support (None uses the bot's only guild)
+LEGACY_GUILD_ID = None
@@ -1,48 +1,76 @@
 import discord
+import asyncio
+import time
 from discord.ext import commands
 from discord import app_commands
+from functools import partial
 
 from config import *
 from functions.display import *
 from functions.database import *
-from extensions.Point import is_admin, SlotDurationView  # Import both is_admin and SlotDurationView
+from functions.slots import slot_registry
+from functions.outbound import rest_scheduler
+from functions.render import render_cache
+from functions.profiler import loop_profiler
+from functions.watchdog import loop_watchdog
+from functions.guilds import guild_settings
+from extensions.Point import GuildCog, is_admin
 
 
-class Admin(commands.Cog):
+class Admin(GuildCog):
     def __init__(self, bot):
         super().__init__()
         self.bot = bot
+        self.checkpoint_task = None
+
+    async def cog_load(self):
+        self.checkpoint_task = asyncio.create_task(self.checkpoint_ledger())
+
+    def cog_unload(self):
+        if self.checkpoint_task:
+            self.checkpoint_task.cancel()
+
+    async def checkpoint_ledger(self):
+        # Keeps audits and balance-at-time lookups from replaying the whole ledger
+        while True:
+            try:
+                checkpoint_id = await db.create_points_checkpoint()
+                if checkpoint_id:
+                    print(f"🟩 | Points checkpoint {checkpoint_id} created")
+            except Exception as e:
+                print(f"Error creating points checkpoint: {e}")
+            await asyncio.sleep(LEDGER_SETTINGS['checkpoint_interval'])
 
     @app_commands.command(name="points", description="User command to display points of users")
     async def points(self, interaction: discord.Interaction, user: discord.User = None):
         if user == None:
             user = interaction.user
 
-        points = get_points(id=user.id)
+        points = await db.get_points(guild_id=interaction.guild_id, id=user.id)
         return await display_points(interaction=interaction, user=user, points=points)
 
     @app_commands.command(name="add-points", description="Admin command to add points to people")
     async def add_points(self, interaction: discord.Interaction, user: discord.User, points: int):
-        if not user_admin(id=interaction.user.id):
+        if not await db.user_admin(guild_id=interaction.guild_id, id=interaction.user.id):
             return await user_forbidden(interaction=interaction)
         
         if points <= 0:
             return await neg_number(interaction=interaction)
         
-        if add_points(id=user.id, points=points):
+        if await db.add_points(guild_id=interaction.guild_id, id=user.id, points=points, reason="admin_add", actor_id=interaction.user.id):
             return await points_added(interaction=interaction, points=points, user=user)
         else:
             return await points_error(interaction=interaction)
         
     @app_commands.command(name="rem-points", description="Admin command to remove points from people")
     async def rem_points(self, interaction: discord.Interaction, user: discord.User, points: int):
-        if not user_admin(id=interaction.user.id):
+        if not await db.user_admin(guild_id=interaction.guild_id, id=interaction.user.id):
             return await user_forbidden(interaction=interaction)
         
         if points <= 0:
             return await neg_number(interaction=interaction)
         
-        if add_points(id=user.id, points=-points):
+        if await db.add_points(guild_id=interaction.guild_id, id=user.id, points=-points, reason="admin_remove", actor_id=interaction.user.id):
             return await points_removed(interaction=interaction, points=points, user=user)
         else:
             return await points_error(interaction=interaction)
@@ -50,20 +78,22 @@ class Admin(commands.Cog):
 
     @app_commands.command(name="add-admin", description="Supreme user command to add a user as an admin")
     async def add_admin(self, interaction: discord.Interaction, user: discord.User):
-        if interaction.user.id != SUPREME_USER:  # Check if the user is the supreme user
+        settings = await guild_settings.get(interaction.guild_id)
+        if not settings.is_supreme(interaction.user.id):  # Check if the user is this guild's supreme user
             return await user_forbidden(interaction=interaction, ephemeral=True)
 
-        if set_admin(id=user.id, is_admin=True):
+        if await db.set_admin(guild_id=interaction.guild_id, id=user.id, is_admin=True):
             await admin_added(interaction=interaction, user=user)
         else:
             await admin_add_failed(interaction=interaction)
 
     @app_commands.command(name="rem-admin", description="Supreme user command to remove an admin")
     async def rem_admin(self, interaction: discord.Interaction):
-        if interaction.user.id != SUPREME_USER:  # Check if the user is the supreme user
+        settings = await guild_settings.get(interaction.guild_id)
+        if not settings.is_supreme(interaction.user.id):  # Check if the user is this guild's supreme user
             return await user_forbidden(interaction=interaction, ephemeral=True)
 
-        admins = get_admins()
+        admins = await db.get_admins(guild_id=interaction.guild_id)
         if not admins:
             return await no_admins_found(interaction=interaction)
 
@@ -74,26 +104,117 @@ class Admin(commands.Cog):
 
         async def callback(select_interaction: discord.Interaction):
             admin_id = int(select_interaction.data["values"][0])
-            if set_admin(id=admin_id, is_admin=False):
+            if await db.set_admin(guild_id=interaction.guild_id, id=admin_id, is_admin=False):
                 await admin_removed(interaction=select_interaction)
             else:
                 await admin_remove_failed(interaction=select_interaction)
 
         await admin_selection_embed(interaction=interaction, options=options)
 
+    @app_commands.command(name="settings", description="Show this server's ticket and shop settings (Admin only)")
+    @is_admin()
+    async def settings(self, interaction: discord.Interaction):
+        await display_guild_settings(interaction=interaction, settings=await guild_settings.get(interaction.guild_id))
+
+    @app_commands.command(name="configure", description="Supreme user command to set this server's ticket category and supreme user")
+    async def configure(self, interaction: discord.Interaction, ticket_category: discord.CategoryChannel = None, supreme_user: discord.User = None):
+        settings = await guild_settings.get(interaction.guild_id)
+        if not settings.is_supreme(interaction.user.id):  # Check if the user is this guild's supreme user
+            return await user_forbidden(interaction=interaction, ephemeral=True)
+
+        changes = {}
+        if ticket_category is not None:
+            changes["ticket_category_id"] = ticket_category.id
+        if supreme_user is not None:
+            changes["supreme_user"] = supreme_user.id
+        settings = await guild_settings.update(interaction.guild_id, **changes) if changes else settings
+        if not settings:
+            return await points_error(interaction=interaction)
+        await display_guild_settings(interaction=interaction, settings=settings, title="✅ Server Settings Updated")
+
+    @app_commands.command(name="ticket-role", description="Supreme user command to add or remove a role that can see tickets")
+    async def ticket_role(self, interaction: discord.Interaction, role: discord.Role):
+        settings = await guild_settings.get(interaction.guild_id)
+        if not settings.is_supreme(interaction.user.id):  # Check if the user is this guild's supreme user
+            return await user_forbidden(interaction=interaction, ephemeral=True)
+
+        roles = tuple(role_id for role_id in settings.ticket_admin_roles if role_id != role.id)
+        if len(roles) == len(settings.ticket_admin_roles):
+            roles += (role.id,)
+        settings = await guild_settings.update(interaction.guild_id, ticket_admin_roles=roles)
+        if not settings:
+            return await points_error(interaction=interaction)
+        await display_guild_settings(interaction=interaction, settings=settings, title="✅ Ticket Roles Updated")
+
+    @app_commands.command(name="set-package", description="Supreme user command to set the price of a points package (0 removes it)")
+    async def set_package(self, interaction: discord.Interaction, points: app_commands.Range[int, 1], price: app_commands.Range[float, 0]):
+        settings = await guild_settings.get(interaction.guild_id)
+        if not settings.is_supreme(interaction.user.id):  # Check if the user is this guild's supreme user
+            return await user_forbidden(interaction=interaction, ephemeral=True)
+
+        prices = dict(settings.points_prices)
+        if price > 0:
+            prices[points] = price
+        else:
+            prices.pop(points, None)
+        settings = await guild_settings.update(interaction.guild_id, points_prices=prices)
+        if not settings:
+            return await points_error(interaction=interaction)
+        await display_guild_settings(interaction=interaction, settings=settings, title="✅ Points Packages Updated")
+
+    @app_commands.command(name="profile", description="Supreme user command to profile the running bot")
+    async def profile(self, interaction: discord.Interaction, seconds: app_commands.Range[int, 1, PROFILER_SETTINGS['max_duration']] = 10):
+        if interaction.user.id != SUPREME_USER:  # Check if the user is the supreme user
+            return await user_forbidden(interaction=interaction, ephemeral=True)
+
+        if loop_profiler.running:
+            return await profile_busy(interaction=interaction)
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        profile = await loop_profiler.run(seconds)
+        await profile_result(interaction=interaction, profile=profile)
+
+    @app_commands.command(name="stalls", description="Show recent event loop stalls (Admin only)")
+    @is_admin()
+    async def stalls(self, interaction: discord.Interaction):
+        await display_stalls(interaction=interaction, stalls=loop_watchdog.recent(), threshold=loop_watchdog.threshold)
+
+    @app_commands.command(name="shards", description="Show gateway and slot load per shard (Admin only)")
+    @is_admin()
+    async def shards(self, interaction: discord.Interaction):
+        shards = await self.bot.get_cog("Point").shard_health()
+        await display_shard_health(interaction=interaction, shards=shards)
+
+    @app_commands.command(name="points-history", description="Show a user's points history, optionally their balance some days ago (Admin only)")
+    @is_admin()
+    async def points_history(self, interaction: discord.Interaction, user: discord.User, limit: app_commands.Range[int, 1, 25] = 10, days_ago: app_commands.Range[int, 0] = None):
+        points = await db.get_points(guild_id=interaction.guild_id, id=user.id)
+        history = await db.get_points_history(guild_id=interaction.guild_id, user_id=user.id, limit=limit)
+        balance_at = None
+        if days_ago is not None:
+            at = int(time.time()) - days_ago * 86400
+            balance_at = (at, await db.get_balance_at(guild_id=interaction.guild_id, user_id=user.id, at=at))
+        await display_points_history(interaction=interaction, user=user, points=points, history=history, balance_at=balance_at)
+
+    @app_commands.command(name="points-audit", description="Check this server's balances against the points ledger (Admin only)")
+    @is_admin()
+    async def points_audit(self, interaction: discord.Interaction):
+        mismatches = [
+            (user_id, ledger, stored) for _, user_id, ledger, stored in await db.audit_points(guild_id=interaction.guild_id)
+        ]
+        await display_points_audit(interaction=interaction, mismatches=mismatches)
+
     @app_commands.command(name="add-slot", description="Admin command to add a slot")
     async def add_slot(self, interaction: discord.Interaction, channel: discord.TextChannel, price_points: int, default_name: str):
-        if not user_admin(id=interaction.user.id):
+        if not await db.user_admin(guild_id=interaction.guild_id, id=interaction.user.id):
             return await user_forbidden(interaction=interaction)
 
-        if add_slot(channel.id, price_points, default_name):
+        if await slot_registry.add(interaction.guild_id, channel.id, price_points, default_name):
             # Get slot info for initial message
-            slot_info = get_slot_info(channel.id)
+            slot_info = await slot_registry.get(channel.id)
             if slot_info:
-                slot_durations = [(key, DURATION_CONFIG[key]) for key in DURATION_CONFIG]
-                view = SlotDurationView(channel.id, slot_durations, self)
-                await delete_all_messages(channel)
-                await display_slot_available(channel, channel.id, slot_durations, view)
+                render = partial(self.bot.get_cog("Point").render_available, channel, channel.id, slot_info[0])
+                rest_scheduler.submit(channel.id, "layout", render)
             await slot_added(interaction, channel, price_points, default_name)
         else:
             embed = discord.Embed(
@@ -105,10 +226,10 @@ class Admin(commands.Cog):
 
     @app_commands.command(name="rem-slot", description="Admin command to remove a slot")
     async def rem_slot(self, interaction: discord.Interaction):
-        if not user_admin(id=interaction.user.id):
+        if not await db.user_admin(guild_id=interaction.guild_id, id=interaction.user.id):
             return await user_forbidden(interaction=interaction)
 
-        slots = get_slots()
+        slots = await slot_registry.ids(interaction.guild_id)
         if not slots:
             embed = discord.Embed(
                 title="🟥 No Slots Found",
@@ -132,7 +253,7 @@ class Admin(commands.Cog):
                     return await select_interaction.response.send_message("This selection is not for you!", ephemeral=True)
                 
                 slot_id = int(self.values[0])
-                if remove_slot(channel_id=slot_id):
+                if await slot_registry.remove(slot_id):
                     channel = await self.outer.bot.fetch_channel(slot_id)
                     await slot_removed(interaction=select_interaction, channel=channel)
                 else:
@@ -158,7 +279,7 @@ class Admin(commands.Cog):
     @app_commands.command(name="set-price", description="Set the price for a slot (Admin only)")
     @is_admin()
     async def set_price(self, interaction: discord.Interaction):
-        slots = get_slots()
+        slots = await slot_registry.ids(interaction.guild_id)
         if not slots:
             embed = discord.Embed(
                 title="🟥 No Slots Found",
@@ -182,7 +303,7 @@ class Admin(commands.Cog):
                     return await select_interaction.response.send_message("This selection is not for you!", ephemeral=True)
                 
                 slot_id = int(self.values[0])
-                slot_info = get_slot_info(slot_id)
+                slot_info = await slot_registry.get(slot_id)
                 if not slot_info:
                     return await select_interaction.response.send_message("Failed to get slot information!", ephemeral=True)
 
@@ -207,21 +328,17 @@ class Admin(commands.Cog):
                             if new_price <= 0:
                                 raise ValueError("Price must be positive")
                             
-                            with db_connection() as conn:
-                                cursor = conn.cursor()
-                                cursor.execute(f"""
-                                    UPDATE slots 
-                                    SET points = {new_price}
-                                    WHERE id = {self.slot_id}
-                                """)
+                            old_info = slot_registry.peek(self.slot_id)
+                            await slot_registry.set_price(self.slot_id, new_price)
+                            if old_info and all(info[0] != old_info[0] for _, info in await slot_registry.all()):
+                                render_cache.forget_price(old_info[0])
                             
-                            # Update the channel message
+                            # Update the channel message, a rented slot shows the new price once it is released
                             channel = interaction.client.get_channel(self.slot_id)
-                            if channel:
-                                slot_durations = [(key, DURATION_CONFIG[key]) for key in DURATION_CONFIG]
-                                view = SlotDurationView(self.slot_id, slot_durations, self.outer)
-                                await delete_all_messages(channel)
-                                await display_slot_available(channel, self.slot_id, slot_durations, view)
+                            slot_info = slot_registry.peek(self.slot_id)
+                            if channel and slot_info and not slot_info[2]:
+                                render = partial(interaction.client.get_cog("Point").render_available, channel, self.slot_id, new_price)
+                                rest_scheduler.submit(self.slot_id, "layout", render)
                             
                             await interaction.response.send_message(
                                 embed=discord.Embed(
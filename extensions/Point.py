@@ -3,19 +3,39 @@ from discord.ext import commands
 from discord import app_commands
 import time
 import asyncio
+from functools import partial
 from discord.app_commands import CheckFailure
 
 from functions.display import *
 from functions.database import *
-from config import DURATION_CONFIG, POINTS_PRICES, TICKET_CATEGORY_ID, TICKET_NAME_FORMAT, TICKET_ADMIN_ROLES, SLOT_CONFIG
+from functions.slots import slot_registry, ExpiryScheduler
+from functions.outbound import rest_scheduler
+from functions.render import render_cache
+from functions.metrics import begin_command, end_command
+from functions.guilds import guild_settings
+from config import DURATION_CONFIG, TICKET_NAME_FORMAT, SLOT_CONFIG
 
 def is_admin():
     async def predicate(interaction: discord.Interaction) -> bool:
-        if user_admin(interaction.user.id):
+        if await db.user_admin(interaction.guild_id, interaction.user.id):
             return True
         raise CheckFailure("You do not have the required permissions to run this command.")
     return app_commands.check(predicate)
 
+class GuildCog(commands.Cog):
+    """Base for the bot's cogs: app commands only run in guilds and are timed for the metrics."""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Runs before every app command in this cog, starts its latency and DB time metrics
+        begin_command(interaction)
+        if interaction.guild_id is None:
+            # Points, slots and tickets all belong to a guild
+            raise app_commands.NoPrivateMessage()
+        return True
+
+    async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        end_command(interaction, "forbidden" if isinstance(error, CheckFailure) else "error")
+
 class SlotPurchaseSelect(discord.ui.Select):
     def __init__(self, slots: list):
         options = [
@@ -32,66 +52,57 @@ class SlotPurchaseSelect(discord.ui.Select):
 
     async def callback(self, interaction: discord.Interaction):
         slot_id = int(self.values[0])
-        from config import DURATION_CONFIG
-        slot_durations = [(key, DURATION_CONFIG[key]) for key in DURATION_CONFIG]  # Prepare slot durations
+        slot_info = await slot_registry.get(slot_id)
         await interaction.response.send_message(
             embed=discord.Embed(
                 title="⏱️ Select Duration",
                 description="Choose how long you want to rent this slot:",
                 color=discord.Color.blue()
             ),
-            view=SlotDurationView(slot_id, slot_durations, self.view.cog),  # Pass required arguments
+            view=SlotDurationView(slot_id, slot_info[0] if slot_info else 100),
             ephemeral=True
         )
 
-class SlotDurationSelect(discord.ui.Select):
-    def __init__(self, slot_id: int, slot_durations: list):
+PURCHASE_FAILURES = {
+    PURCHASE_SLOT_MISSING: "Invalid slot ID!",
+    PURCHASE_SLOT_OCCUPIED: "This slot is currently occupied!",
+    PURCHASE_ALREADY_RENTING: "You already have an active slot!",
+    PURCHASE_INSUFFICIENT_POINTS: "You don't have enough points!",
+    PURCHASE_BUSY: "The shop is busy right now, please try again!"
+}
+
+class SlotDurationSelect(discord.ui.DynamicItem[discord.ui.Select], template=r"slot:duration:(?P<slot_id>[0-9]+)"):
+    def __init__(self, slot_id: int, points_per_duration: int = 0):
         self.slot_id = slot_id
-        # Fetch the slot's points_per_duration from the database
-        slot_info = get_slot_info(slot_id)
-        points_per_duration = slot_info[0] if slot_info else 100
-        options = [
-            discord.SelectOption(
-                label=duration["name"],
-                description=f"Buy {duration['name']} for {int(points_per_duration * (duration['seconds'] / 3600))} Points",
-                value=key
-            ) for key, duration in slot_durations
-        ]
-        super().__init__(placeholder="Duration you want to buy", options=options)
+        super().__init__(discord.ui.Select(
+            placeholder="Duration you want to buy",
+            options=list(render_cache.duration_options(points_per_duration)),
+            custom_id=f"slot:duration:{slot_id}"
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls(int(match["slot_id"]))
 
     async def callback(self, interaction: discord.Interaction):
         try:
-            # Enforce one slot per user
-            current_slot = get_user_slot(interaction.user.id)
-            if current_slot:
-                await interaction.response.send_message(
-                    embed=discord.Embed(
-                        title="❌ Slot Purchase Failed",
-                        description="You already have an active slot!",
-                        color=discord.Color.red()
-                    ),
-                    ephemeral=True
-                )
-                return
-            duration = self.values[0]
-            slot_info = get_slot_info(self.slot_id)
+            duration = self.item.values[0]
+            slot_info = await slot_registry.get(self.slot_id)
             if not slot_info:
                 await slot_purchase_failed(interaction, "Invalid slot ID!", ephemeral=True)
                 return
-            points_per_duration, default_name, occupied, occupied_by, occupied_till, pings_left = slot_info
-            if occupied:
-                await slot_purchase_failed(interaction, "This slot is currently occupied!", ephemeral=True)
-                return
-            duration_info = DURATION_CONFIG[duration]
-            duration_seconds = duration_info["seconds"]
-            points_cost = int(points_per_duration * (duration_seconds / 3600))
-            if purchase_slot(self.slot_id, interaction.user.id, duration_seconds, points_cost):
-                await self.view.display_claimed(interaction, self.slot_id, interaction.user)
+            points_per_duration = slot_info[0]
+            duration_seconds = DURATION_CONFIG[duration]["seconds"]
+            _, points_cost = render_cache.duration_costs(points_per_duration)[duration]
+            # Availability, one slot per user and the balance are all checked inside the purchase itself
+            result = await slot_registry.purchase(self.slot_id, interaction.user.id, duration_seconds, points_cost)
+            if result.ok:
+                await interaction.client.get_cog("Point").display_claimed(interaction, self.slot_id, interaction.user)
             else:
                 await interaction.response.send_message(
                     embed=discord.Embed(
                         title="❌ Slot Purchase Failed",
-                        description="You don't have enough points or an error occurred!",
+                        description=PURCHASE_FAILURES.get(result.status, "An error occurred!"),
                         color=discord.Color.red()
                     ),
                     ephemeral=True
@@ -106,39 +117,48 @@ class SlotDurationSelect(discord.ui.Select):
                 ephemeral=True
             )
 
-class SlotDurationView(discord.ui.View):
-    def __init__(self, slot_id: int, slot_durations: list, cog):
-        super().__init__(timeout=None)  # Make the view persistent
-        self.add_item(SlotDurationSelect(slot_id, slot_durations))
-        self.cog = cog
-
-    async def display_claimed(self, interaction, slot_id, user):
-        await self.cog.display_claimed(interaction, slot_id, user)
-
-class SlotClaimedView(discord.ui.View):
-    def __init__(self, owner_id, cog, slot_id, username, available_until, claimed_message=None, claimed_embed=None, info_message=None):
-        super().__init__(timeout=None)  # Make the view persistent
-        self.owner_id = owner_id
-        self.cog = cog
+class SlotDurationView(RoutedView):
+    def __init__(self, slot_id: int, points_per_duration: int):
+        super().__init__(SlotDurationSelect(slot_id, points_per_duration))
+
+async def fetch_claimed_message(channel: discord.TextChannel, slot_id: int):
+    claimed_message_id, _, _ = await slot_registry.messages(slot_id)
+    if not claimed_message_id:
+        return None
+    try:
+        return await channel.fetch_message(claimed_message_id)
+    except discord.NotFound:
+        return None
+
+class SlotSetupButton(discord.ui.DynamicItem[discord.ui.Button], template=r"slot:setup:(?P<slot_id>[0-9]+)"):
+    def __init__(self, slot_id: int):
         self.slot_id = slot_id
-        self.username = username
-        self.available_until = available_until
-        self.claimed_message = claimed_message
-        self.claimed_embed = claimed_embed
-        self.info_message = info_message
+        super().__init__(discord.ui.Button(
+            label="Setup Slot",
+            style=discord.ButtonStyle.primary,
+            custom_id=f"slot:setup:{slot_id}"
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["slot_id"]))
 
-    @discord.ui.button(label="Setup Slot", style=discord.ButtonStyle.primary)
-    async def setup_slot(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def callback(self, interaction: discord.Interaction):
         try:
-            if interaction.user.id != self.owner_id:
+            slot_info = await slot_registry.get(self.slot_id)
+            if not slot_info or not slot_info[2] or interaction.user.id != slot_info[3]:
                 await user_forbidden(interaction, ephemeral=True)
                 return
+            claimed_message = await fetch_claimed_message(interaction.channel, self.slot_id)
+            if not claimed_message:
+                await slot_purchase_failed(interaction, "Could not find your slot message!", ephemeral=True)
+                return
             setup_embed = discord.Embed(
                 title="Slot Setup",
                 description="Setup your Slot by using the menu below.",
                 color=discord.Color.blue()
             )
-            view = SetupOptionsView(setup_embed, self.claimed_message)
+            view = SetupOptionsView(claimed_message.embeds[0], claimed_message)
             await interaction.response.send_message(embed=setup_embed, view=view, ephemeral=True)
         except Exception as e:
             await interaction.response.send_message(
@@ -150,16 +170,28 @@ class SlotClaimedView(discord.ui.View):
                 ephemeral=True
             )
 
-    @discord.ui.button(label="Use Ping", style=discord.ButtonStyle.secondary)
-    async def use_ping(self, interaction: discord.Interaction, button: discord.ui.Button):
+class SlotPingButton(discord.ui.DynamicItem[discord.ui.Button], template=r"slot:ping:(?P<slot_id>[0-9]+)"):
+    def __init__(self, slot_id: int):
+        self.slot_id = slot_id
+        super().__init__(discord.ui.Button(
+            label="Use Ping",
+            style=discord.ButtonStyle.secondary,
+            custom_id=f"slot:ping:{slot_id}"
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["slot_id"]))
+
+    async def callback(self, interaction: discord.Interaction):
         try:
-            if interaction.user.id != self.owner_id:
-                await user_forbidden(interaction, ephemeral=True)
-                return
             # Get current pings from database
-            slot_info = get_slot_info(self.slot_id)
+            slot_info = await slot_registry.get(self.slot_id)
             if not slot_info:
                 return
+            if not slot_info[2] or interaction.user.id != slot_info[3]:
+                await user_forbidden(interaction, ephemeral=True)
+                return
             pings_left = slot_info[5]
             if pings_left <= 0:
                 await interaction.response.send_message(
@@ -172,14 +204,14 @@ class SlotClaimedView(discord.ui.View):
                 )
                 return
             # Update pings in database
-            update_slot_pings(self.slot_id, pings_left - 1)
-            # Update info embed
+            await slot_registry.set_pings(self.slot_id, pings_left - 1)
+            # Update info embed, the button sits on the info message
             info_embed = discord.Embed(
                 title="Slot Information",
-                description=f"**Pings Left - {pings_left - 1}**\nSlot available {self.available_until}",
+                description=f"**Pings Left - {pings_left - 1}**\nSlot available <t:{slot_info[4]}:R>",
                 color=discord.Color.blue()
             )
-            await self.info_message.edit(embed=info_embed, view=self)
+            rest_scheduler.submit(self.slot_id, "info", partial(interaction.message.edit, embed=info_embed))
             # Send ping message with embed
             ping_embed = discord.Embed(
                 title="Ping Used",
@@ -205,6 +237,10 @@ class SlotClaimedView(discord.ui.View):
                 ephemeral=True
             )
 
+class SlotClaimedView(RoutedView):
+    def __init__(self, slot_id: int):
+        super().__init__(SlotSetupButton(slot_id), SlotPingButton(slot_id))
+
 class SetupOptionsSelect(discord.ui.Select):
     def __init__(self, parent_view):
         options = [
@@ -224,7 +260,7 @@ class SetupOptionsSelect(discord.ui.Select):
 
 class SetupOptionsView(discord.ui.View):
     def __init__(self, embed, claimed_message):
-        super().__init__(timeout=None)
+        super().__init__(timeout=600)
         self.embed = embed
         self.claimed_message = claimed_message
         self.add_item(SetupOptionsSelect(self))
@@ -302,86 +338,181 @@ class SlotPurchaseView(discord.ui.View):
         super().__init__()
         self.add_item(SlotPurchaseSelect(slots))
 
-class Point(commands.Cog):
+class Point(GuildCog):
     def __init__(self, bot):
         super().__init__()
         self.bot = bot
-        create_ticket_tables()
-        self.slot_check_task = self.bot.loop.create_task(self.check_slot_times())
+        # One expiry scheduler per shard, each releasing only the slots in that shard's guilds
+        self.expiry_schedulers = {}
+        # Slot components carry their slot ID in custom_id and are routed here, even after a restart
+        self.bot.add_dynamic_items(SlotDurationSelect, SlotSetupButton, SlotPingButton, PointPurchaseButton)
 
     def cog_unload(self):
-        if self.slot_check_task:
-            self.slot_check_task.cancel()
-
-    async def check_slot_times(self):
-        await self.bot.wait_until_ready()
-        while not self.bot.is_closed():
-            try:
-                slots = get_slots()
-                current_time = int(time.time())
-                for slot_id in slots:
-                    slot_info = get_slot_info(slot_id)
-                    if not slot_info:
-                        continue
-                    points_per_duration, default_name, occupied, occupied_by, occupied_till, pings_left = slot_info
-                    if points_per_duration is None:
-                        print(f"Warning: Slot {slot_id} has no points_per_duration set. Skipping.")
-                        continue
-                    slot_durations = [(key, DURATION_CONFIG[key]) for key in DURATION_CONFIG]
-                    channel = self.bot.get_channel(slot_id)
-                    if occupied and occupied_till and current_time >= occupied_till:
-                        if channel:
-                            try:
-                                await delete_all_messages(channel)
-                                view = SlotDurationView(slot_id, slot_durations, self)
-                                await display_slot_available(channel, slot_id, slot_durations, view)
-                                await channel.edit(name=default_name)
-                                with db_connection() as conn:
-                                    cursor = conn.cursor()
-                                    cursor.execute(f"""
-                                        UPDATE slots 
-                                        SET occupied = 0, 
-                                            occupied_by = 0, 
-                                            occupied_till = 0,
-                                            pings_left = {SLOT_CONFIG['default_pings']} 
-                                        WHERE id = {slot_id}
-                                    """)
-                            except Exception as e:
-                                print(f"Error resetting slot {slot_id}: {e}")
-            except Exception as e:
-                print(f"Error in slot check loop: {e}")
-            await asyncio.sleep(10)
+        for scheduler in self.expiry_schedulers.values():
+            scheduler.stop()
+        self.bot.remove_dynamic_items(SlotDurationSelect, SlotSetupButton, SlotPingButton, PointPurchaseButton)
+
+    async def release_slots(self, slot_ids: list):
+        # Called by the expiry scheduler once the slots are already reset in the database
+        for slot_id in slot_ids:
+            slot_info = slot_registry.peek(slot_id)
+            channel = self.bot.get_channel(slot_id)
+            if not slot_info or not channel:
+                continue
+            points_per_duration, default_name, occupied, occupied_by, occupied_till, pings_left = slot_info
+            # Queued per channel, so a rename held back by Discord's limit doesn't stall the other slots
+            rest_scheduler.submit(slot_id, "layout", partial(self.render_available, channel, slot_id, points_per_duration))
+            rest_scheduler.submit(slot_id, "rename", partial(channel.edit, name=default_name))
 
     async def cog_load(self):
-        # On cog load (bot startup), delete all messages and send available embed for every slot channel
+        # On cog load (bot startup), bring every slot channel in line with the database
         await self.bot.wait_until_ready()
-        slots = get_slots()
-        for slot_id in slots:
-            slot_info = get_slot_info(slot_id)  # Retrieve slot information here
-            if not slot_info:
-                continue
-            points_per_duration, default_name, occupied, occupied_by, occupied_till, pings_left = slot_info
-            if points_per_duration is None:
-                print(f"Warning: Slot {slot_id} has no points_per_duration set. Skipping.")
-                continue
-            slot_durations = [(key, DURATION_CONFIG[key]) for key in DURATION_CONFIG]
-            channel = self.bot.get_channel(slot_id)
-            if channel:
+        await db.create_ticket_tables()
+        await slot_registry.load(force=True)
+        await asyncio.gather(*(self.start_shard(shard_id) for shard_id in sorted(self.bot.shards)))
+
+    async def start_shard(self, shard_id: int):
+        await self.reconcile_slots(shard_id)
+        if shard_id not in self.expiry_schedulers:
+            scheduler = ExpiryScheduler(slot_registry, self.release_slots, owns=partial(self.owns_slot, shard_id))
+            self.expiry_schedulers[shard_id] = scheduler
+            await scheduler.start()
+
+    @commands.Cog.listener()
+    async def on_shard_ready(self, shard_id: int):
+        # A shard that had to re-identify may have missed edits while it was away
+        if shard_id in self.expiry_schedulers:
+            await self.reconcile_slots(shard_id)
+
+    def slot_shard(self, slot_id: int) -> int:
+        channel = self.bot.get_channel(slot_id)
+        if channel is not None and getattr(channel, "guild", None) is not None:
+            return channel.guild.shard_id
+        # Channel not cached, the slot's guild still says which shard it belongs to
+        guild_id = slot_registry.guild_of(slot_id)
+        if guild_id and self.bot.shard_count:
+            shard_id = (guild_id >> 22) % self.bot.shard_count
+            if shard_id in self.bot.shards:
+                return shard_id
+        # Slots whose guild is gone still have to expire, the first shard takes them
+        return min(self.bot.shards)
+
+    def owns_slot(self, shard_id: int, slot_id: int) -> bool:
+        return self.slot_shard(slot_id) == shard_id
+
+    async def reconcile_slots(self, shard_id: int = None):
+        """Check every slot channel (of one shard) concurrently, re-rendering only the ones that don't match the database."""
+        semaphore = asyncio.Semaphore(SLOT_CONFIG['reconcile_concurrency'])
+        started = time.perf_counter()
+
+        async def reconcile(slot_id, slot_info):
+            async with semaphore:
+                slot_started = time.perf_counter()
                 try:
-                    await delete_all_messages(channel)
-                    await display_slot_available(channel, slot_id, slot_durations, SlotDurationView(slot_id, slot_durations, self))
+                    action = await self.reconcile_slot(slot_id, slot_info)
                 except Exception as e:
-                    print(f"Error initializing slot {slot_id}: {e}")
+                    action = f"failed ({e})"
+                print(f"🟩 | Slot {slot_id} {action} in {time.perf_counter() - slot_started:.2f}s")
+
+        slots = [
+            (slot_id, slot_info) for slot_id, slot_info in await slot_registry.all()
+            if shard_id is None or self.owns_slot(shard_id, slot_id)
+        ]
+        await asyncio.gather(*(reconcile(slot_id, slot_info) for slot_id, slot_info in slots))
+        shard = f" on shard {shard_id}" if shard_id is not None else ""
+        print(f"🟩 | {len(slots)} slots reconciled{shard} in {time.perf_counter() - started:.2f}s")
+
+    async def shard_health(self) -> list:
+        """One row per shard: (shard_id, latency, closed, guilds, slots, occupied, expiry_running, next_due)."""
+        guilds, slots, occupied = {}, {}, {}
+        for guild in self.bot.guilds:
+            guilds[guild.shard_id] = guilds.get(guild.shard_id, 0) + 1
+        for slot_id, slot_info in await slot_registry.all():
+            shard_id = self.slot_shard(slot_id)
+            slots[shard_id] = slots.get(shard_id, 0) + 1
+            occupied[shard_id] = occupied.get(shard_id, 0) + bool(slot_info[2])
+        rows = []
+        for shard_id, shard in sorted(self.bot.shards.items()):
+            scheduler = self.expiry_schedulers.get(shard_id)
+            running = scheduler is not None and scheduler.running
+            rows.append((
+                shard_id,
+                shard.latency,
+                shard.is_closed(),
+                guilds.get(shard_id, 0),
+                slots.get(shard_id, 0),
+                occupied.get(shard_id, 0),
+                running,
+                scheduler.next_due() if running else None
+            ))
+        return rows
+
+    async def reconcile_slot(self, slot_id: int, slot_info: tuple) -> str:
+        points_per_duration, default_name, occupied, occupied_by, occupied_till, pings_left = slot_info
+        if points_per_duration is None:
+            return "skipped (no points_per_duration set)"
+        channel = self.bot.get_channel(slot_id)
+        if not channel:
+            return "skipped (channel not found)"
+
+        claimed_message_id, info_message_id, available_message_id = await slot_registry.messages(slot_id)
+        if not (claimed_message_id and info_message_id) and not available_message_id:
+            # Rendered before message IDs were stored, pick them up from the channel once
+            if await self.adopt_layout(channel, slot_id, occupied):
+                claimed_message_id, info_message_id, available_message_id = await slot_registry.messages(slot_id)
+
+        if occupied:
+            owner = self.bot.get_user(occupied_by) or await self.bot.fetch_user(occupied_by)
+            if claimed_message_id and info_message_id:
+                # The buttons are routed by custom_id, so at most the info text needs refreshing
+                try:
+                    info_message = await channel.fetch_message(info_message_id)
+                except discord.NotFound:
+                    info_message = None
+                if info_message:
+                    info_embed = self.info_embed(slot_info)
+                    if info_message.embeds and info_message.embeds[0].description == info_embed.description:
+                        return "unchanged"
+                    await info_message.edit(embed=info_embed)
+                    return "refreshed slot information"
+            await self.render_claimed(channel, slot_id, owner.id, owner.name)
+            return "re-rendered claimed layout"
+
+        if available_message_id:
+            try:
+                await channel.fetch_message(available_message_id)
+                return "unchanged"
+            except discord.NotFound:
+                pass
+        await self.render_available(channel, slot_id, points_per_duration)
+        return "re-rendered available layout"
+
+    async def adopt_layout(self, channel, slot_id: int, occupied: bool) -> bool:
+        """Store the IDs of an intact layout posted before they were tracked."""
+        messages = [message async for message in channel.history(limit=3)]
+        titles = [message.embeds[0].title if message.embeds else None for message in messages]
+        if occupied and len(messages) == 2 and titles[0] == "Slot Information" and (titles[1] or "").startswith("Slot - "):
+            return await slot_registry.set_messages(slot_id, claimed_message_id=messages[1].id, info_message_id=messages[0].id)
+        if not occupied and len(messages) == 1 and titles[0] == f"Slot {slot_id} - Available":
+            return await slot_registry.set_messages(slot_id, available_message_id=messages[0].id)
+        return False
+
+    async def render_available(self, channel, slot_id: int, points_per_duration: int):
+        view = SlotDurationView(slot_id, points_per_duration)
+        message = await display_slot_available(channel, slot_id, view, await slot_registry.messages(slot_id))
+        await slot_registry.set_messages(slot_id, available_message_id=message.id)
 
     @app_commands.command(name="points-shop", description="Open the points shop")
     async def points_shop(self, interaction: discord.Interaction):
-        add_user(id=interaction.user.id)
-        await display_points_shop(interaction, self)
+        await db.add_user(guild_id=interaction.guild_id, id=interaction.user.id)
+        await display_points_shop(interaction)
 
     async def create_purchase_ticket(self, interaction: discord.Interaction):
-        # Get the category for tickets
-        category = self.bot.get_channel(TICKET_CATEGORY_ID)
-        if not category:
+        settings = await guild_settings.get(interaction.guild_id)
+
+        # Get the category for tickets, it has to be one of this guild's
+        category = self.bot.get_channel(settings.ticket_category_id)
+        if not category or category.guild.id != interaction.guild_id:
             await slot_purchase_failed(interaction, "Ticket system is not properly configured!")
             return
 
@@ -393,7 +524,7 @@ class Point(commands.Cog):
         }
         
         # Add admin role overwrites
-        for role_id in TICKET_ADMIN_ROLES:
+        for role_id in settings.ticket_admin_roles:
             role = interaction.guild.get_role(role_id)
             if role:
                 overwrites[role] = discord.PermissionOverwrite(read_messages=True)
@@ -404,41 +535,24 @@ class Point(commands.Cog):
         )
 
         # Create ticket in database
-        ticket_id = create_ticket(channel.id, interaction.user.id)
+        ticket_id = await db.create_ticket(interaction.guild_id, channel.id, interaction.user.id)
         if not ticket_id:
             await channel.delete()
             await slot_purchase_failed(interaction, "Failed to create ticket!")
             return
 
         # Update channel name with ticket ID
-        await channel.edit(name=TICKET_NAME_FORMAT.format(user_name=interaction.user.name, ticket_id=ticket_id))
+        rest_scheduler.submit(channel.id, "rename", partial(channel.edit, name=TICKET_NAME_FORMAT.format(user_name=interaction.user.name, ticket_id=ticket_id)))
 
         # Get crypto addresses
-        addresses = get_crypto_addresses()
+        addresses = await db.get_crypto_addresses()
         if not addresses:
             await channel.delete()
             await slot_purchase_failed(interaction, "No payment methods available!")
             return
 
         # Send initial message
-        embed = discord.Embed(
-            title="🎫 Point Purchase Ticket",
-            description="Welcome to your point purchase ticket! Please follow these steps:\n\n"
-                       "1. Select your desired cryptocurrency from the dropdown menu\n"
-                       "2. Send the exact amount to the provided address\n"
-                       "3. Click 'Finish' and provide your transaction ID\n\n"
-                       "Available Points Packages:",
-            color=discord.Color.blue()
-        )
-
-        for points, price in POINTS_PRICES.items():
-            embed.add_field(
-                name=f"{points} Points",
-                value=f"Price: {price}$",
-                inline=True
-            )
-
-        await channel.send(embed=embed, view=TicketView(addresses))
+        await channel.send(embed=render_cache.ticket_embed(settings.points_prices), view=TicketView(ticket_id, addresses, settings.points_prices))
         await interaction.response.send_message(
             embed=discord.Embed(
                 title="✅ Ticket Created",
@@ -451,29 +565,25 @@ class Point(commands.Cog):
         
     @app_commands.command(name="check-slots", description="Check available slots")
     async def check_slots(self, interaction: discord.Interaction):
-        slots = get_slots()
+        slots = await slot_registry.all(interaction.guild_id)
         if not slots:
             return await slot_purchase_failed(interaction, "No slots are currently available!")
         
         slot_info = []
-        for slot_id in slots:
-            info = get_slot_info(slot_id)
-            if info:
-                slot_info.append((slot_id, *info[:3]))  # Include id, points, name, and occupied status
+        for slot_id, info in slots:
+            slot_info.append((slot_id, *info[:3]))  # Include id, points, name, and occupied status
         
         await display_available_slots(interaction, slot_info)
 
     @app_commands.command(name="slot-info", description="Get information about slots")
     async def slot_info(self, interaction: discord.Interaction):
-        slots = get_slots()
+        slots = await slot_registry.all(interaction.guild_id)
         if not slots:
             return await slot_purchase_failed(interaction, "No slots are currently available!")
         
         slot_info = []
-        for slot_id in slots:
-            info = get_slot_info(slot_id)
-            if info:
-                slot_info.append((slot_id, *info[:3]))
+        for slot_id, info in slots:
+            slot_info.append((slot_id, *info[:3]))
         
         await interaction.response.send_message(
             embed=discord.Embed(
@@ -485,36 +595,56 @@ class Point(commands.Cog):
         )
 
     async def display_claimed(self, interaction, slot_id, user):
-        slot_info = get_slot_info(slot_id)
-        if not slot_info:
-            return
-        pings_left = slot_info[5]  # Get pings_left from database
-        available_until_ts = slot_info[4]  # occupied_till
-        username = user.name
-        owner_id = user.id
+        await interaction.response.defer()
+        rest_scheduler.submit(slot_id, "layout", partial(self.render_claimed, interaction.channel, slot_id, user.id, user.name))
+
+    def claimed_embeds(self, slot_info: tuple, username: str) -> tuple:
         claimed_embed = discord.Embed(
             title=f"Slot - {username}",
             description="No Shop setup yet",
             color=discord.Color.purple()
         )
+        return claimed_embed, self.info_embed(slot_info), self.available_until(slot_info)
+
+    def available_until(self, slot_info: tuple) -> str:
+        available_until_ts = slot_info[4]  # occupied_till
         # Format the timestamp for Discord
         if available_until_ts and available_until_ts > 0:
-            available_until = f"<t:{available_until_ts}:R>"
-        else:
-            available_until = "N/A"
-        info_embed = discord.Embed(
+            return f"<t:{available_until_ts}:R>"
+        return "N/A"
+
+    def info_embed(self, slot_info: tuple) -> discord.Embed:
+        pings_left = slot_info[5]  # Get pings_left from database
+        return discord.Embed(
             title="Slot Information",
-            description=f"**Pings Left - {pings_left}**\nSlot available {available_until}",
+            description=f"**Pings Left - {pings_left}**\nSlot available {self.available_until(slot_info)}",
             color=discord.Color.blue()
         )
-        channel = interaction.channel
-        await delete_all_messages(channel)
+
+    async def render_claimed(self, channel, slot_id, owner_id, username):
+        slot_info = await slot_registry.get(slot_id)
+        if not slot_info:
+            return
+        claimed_embed, info_embed, available_until = self.claimed_embeds(slot_info, username)
+        await delete_all_messages(channel, await slot_registry.messages(slot_id))
         claimed_message = await channel.send(embed=claimed_embed)
-        info_message = await channel.send(embed=info_embed)
-        view = SlotClaimedView(  # pass info_message for updating
-            owner_id, self, slot_id, username, available_until, claimed_message=claimed_message, claimed_embed=claimed_embed, info_message=info_message
-        )
-        await info_message.edit(view=view)
+        info_message = await channel.send(embed=info_embed, view=SlotClaimedView(slot_id))
+        await slot_registry.set_messages(slot_id, claimed_message_id=claimed_message.id, info_message_id=info_message.id)
+
+    async def refresh_slot_information(self, slot_id: int, owner: discord.User):
+        """Edit the tracked info message in place, re-rendering the claimed layout if it is gone."""
+        channel = self.bot.get_channel(slot_id)
+        slot_info = await slot_registry.get(slot_id)
+        if not channel or not slot_info:
+            return
+        _, info_message_id, _ = await slot_registry.messages(slot_id)
+        if info_message_id:
+            try:
+                await channel.get_partial_message(info_message_id).edit(embed=self.info_embed(slot_info))
+                return
+            except discord.NotFound:
+                pass
+        await self.render_claimed(channel, slot_id, owner.id, owner.name)
 
     async def display_setup(self, interaction, slot_id, ephemeral=False):
         view = SetupSelectView(self, slot_id)
@@ -545,7 +675,7 @@ class Point(commands.Cog):
     @is_admin()
     async def add_pings(self, interaction: discord.Interaction, user: discord.User, amount: int):
         # Check if user has an active slot
-        current_slot = get_user_slot(user.id)
+        current_slot = await slot_registry.user_slot(interaction.guild_id, user.id)
         if not current_slot:
             await interaction.response.send_message(
                 embed=discord.Embed(
@@ -558,24 +688,17 @@ class Point(commands.Cog):
             return
 
         slot_id = current_slot[0]
-        slot_info = get_slot_info(slot_id)
+        slot_info = await slot_registry.get(slot_id)
         if not slot_info:
             return
 
         # Get current pings and add the new amount
         current_pings = slot_info[5]  # pings_left is at index 5
         new_pings = current_pings + amount
-        update_slot_pings(slot_id, new_pings)
+        await slot_registry.set_pings(slot_id, new_pings)
 
         # Update the embed message
-        channel = self.bot.get_channel(slot_id)
-        if channel:
-            async for message in channel.history(limit=10):
-                if message.embeds and "Slot Information" in message.embeds[0].title:
-                    embed = message.embeds[0]
-                    embed.description = f"**Pings Left - {new_pings}**\nSlot available {embed.description.split('Slot available')[1]}"
-                    await message.edit(embed=embed)
-                    break
+        rest_scheduler.submit(slot_id, "info", partial(self.refresh_slot_information, slot_id, user))
 
         await interaction.response.send_message(
             embed=discord.Embed(
@@ -590,7 +713,7 @@ class Point(commands.Cog):
     @is_admin()
     async def remove_pings(self, interaction: discord.Interaction, user: discord.User, amount: int):
         # Check if user has an active slot
-        current_slot = get_user_slot(user.id)
+        current_slot = await slot_registry.user_slot(interaction.guild_id, user.id)
         if not current_slot:
             await interaction.response.send_message(
                 embed=discord.Embed(
@@ -603,24 +726,17 @@ class Point(commands.Cog):
             return
 
         slot_id = current_slot[0]
-        slot_info = get_slot_info(slot_id)
+        slot_info = await slot_registry.get(slot_id)
         if not slot_info:
             return
 
         # Get current pings and remove the amount
         current_pings = slot_info[5]  # pings_left is at index 5
         new_pings = max(0, current_pings - amount)  # Ensure pings don't go below 0
-        update_slot_pings(slot_id, new_pings)
+        await slot_registry.set_pings(slot_id, new_pings)
 
         # Update the embed message
-        channel = self.bot.get_channel(slot_id)
-        if channel:
-            async for message in channel.history(limit=10):
-                if message.embeds and "Slot Information" in message.embeds[0].title:
-                    embed = message.embeds[0]
-                    embed.description = f"**Pings Left - {new_pings}**\nSlot available {embed.description.split('Slot available')[1]}"
-                    await message.edit(embed=embed)
-                    break
+        rest_scheduler.submit(slot_id, "info", partial(self.refresh_slot_information, slot_id, user))
 
         await interaction.response.send_message(
             embed=discord.Embed(
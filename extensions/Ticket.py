@@ -2,12 +2,48 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 
+from config import VERIFICATION_SETTINGS
+from functions.display import *
+from functions.database import *
+from functions.blockchain import BlockchainVerifier
+from functions.verification import VerificationPool
+
 
 class Ticket(commands.Cog):
     def __init__(self, bot):
         super().__init__()
         self.bot = bot
+        self.verifications = VerificationPool(self.verification_result)
+        # Ticket components carry their ticket ID in custom_id and are routed here, even after a restart
+        self.bot.add_dynamic_items(*TICKET_COMPONENTS)
+
+    async def cog_load(self):
+        await BlockchainVerifier.open_session()
+        await db.create_ticket_tables()
+        await self.verifications.start()
+
+    async def cog_unload(self):
+        self.verifications.stop()
+        self.bot.remove_dynamic_items(*TICKET_COMPONENTS)
+        await BlockchainVerifier.close_session()
+
+    async def verification_result(self, ticket: tuple, verified: bool):
+        ticket_id, channel_id = ticket[0], ticket[1]
+        channel = self.bot.get_channel(channel_id)
+        if not channel:
+            if verified:
+                # Ticket channel is gone, leave the payment for an admin to settle
+                await db.set_ticket_status(ticket_id, 'verified')
+            return
+
+        if not verified:
+            await payment_verification_failed(channel)
+        elif VERIFICATION_SETTINGS['auto_approve']:
+            await complete_verified_payment(channel, ticket)
+        else:
+            await db.set_ticket_status(ticket_id, 'verified')
+            await payment_awaiting_approval(channel, ticket_id)
 
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(Ticket(bot=bot))
\ No newline at end of file
+    await bot.add_cog(Ticket(bot=bot))
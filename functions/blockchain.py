@@ -1,8 +1,191 @@
-import requests
+import aiohttp
+import asyncio
 import json
-from config import CRYPTO_ADDRESSES, VERIFICATION_SETTINGS, API_KEYS
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+from config import CRYPTO_ADDRESSES, VERIFICATION_SETTINGS, API_KEYS, HTTP_SETTINGS, PRICE_ORACLE_SETTINGS, TRANSACTION_CACHE_SETTINGS
+from functions.metrics import explorer_request_seconds, verifications
+
+class PriceOracle:
+    """
+    USD spot prices with a per-asset TTL cache.
+    A quote close to expiry is refreshed in the background while the cached
+    value is still served. An expired quote is refreshed inline, but if the
+    provider is slow or failing the stale value is used for up to `max_stale` seconds.
+    """
+    PROVIDERS = {
+        "BTC": "https://bitaps.com/js/get/update",
+        "LTC": "https://ltc.bitaps.com/js/get/update"
+    }
+
+    _quotes = {}        # asset -> (price, fetched_at)
+    _refreshing = {}    # asset -> running refresh task
+
+    @classmethod
+    async def get_price(cls, asset: str) -> float:
+        """Return the USD price of `asset`, or None if no usable quote is available."""
+        ttl = PRICE_ORACLE_SETTINGS['ttl']
+        quote = cls._quotes.get(asset)
+        if quote is None:
+            try:
+                return await cls._refresh(asset)
+            except Exception:
+                return None
+
+        price, fetched_at = quote
+        age = time.monotonic() - fetched_at
+        if age < ttl:
+            if age >= ttl - PRICE_ORACLE_SETTINGS['refresh_ahead']:
+                cls._refresh(asset)
+            return price
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(cls._refresh(asset)), PRICE_ORACLE_SETTINGS['fetch_timeout'])
+        except Exception:
+            if age < PRICE_ORACLE_SETTINGS['max_stale']:
+                return price
+            return None
+
+    @classmethod
+    def _refresh(cls, asset: str) -> asyncio.Task:
+        """Start a refresh of `asset`, or return the one already running."""
+        task = cls._refreshing.get(asset)
+        if task is None:
+            task = asyncio.ensure_future(cls._fetch(asset))
+            task.add_done_callback(lambda t: cls._refresh_done(asset, t))
+            cls._refreshing[asset] = task
+        return task
+
+    @classmethod
+    def _refresh_done(cls, asset: str, task: asyncio.Task):
+        if cls._refreshing.get(asset) is task:
+            del cls._refreshing[asset]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error refreshing {asset} price: {task.exception()}")
+
+    @classmethod
+    async def _fetch(cls, asset: str) -> float:
+        price_data = await BlockchainVerifier._fetch_json("POST", cls.PROVIDERS[asset])
+        if price_data is None:
+            raise RuntimeError(f"price provider for {asset} did not answer")
+        price = float(price_data['average']['dollars'].replace(" ", "") + "." + price_data['average']['cents'])
+        cls._quotes[asset] = (price, time.monotonic())
+        return price
+
+class TransactionCache:
+    """
+    Bounded LRU cache of explorer answers keyed by (network, tx_id).
+    Each entry carries its own TTL, so confirmed transactions, pending ones
+    and "not found" answers (stored as None) can expire at different times.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (value, expires_at)
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> tuple:
+        """Return (found, value). A cached "not found" answer is (True, None)."""
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        if entry[0] is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return True, entry[0]
+
+    def put(self, key: tuple, value, ttl: float):
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses
+        }
+
 
 class BlockchainVerifier:
+    transaction_cache = TransactionCache(TRANSACTION_CACHE_SETTINGS['max_entries'])
+
+    # Shared across all verifications so explorer connections are pooled and kept alive
+    session: aiohttp.ClientSession = None
+
+    @classmethod
+    async def open_session(cls) -> aiohttp.ClientSession:
+        if cls.session is None or cls.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_SETTINGS['pool_size'],
+                limit_per_host=HTTP_SETTINGS['pool_size_per_host'],
+                ttl_dns_cache=HTTP_SETTINGS['dns_cache_ttl'],
+                keepalive_timeout=HTTP_SETTINGS['keepalive_timeout']
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=HTTP_SETTINGS['request_timeout'],
+                sock_connect=HTTP_SETTINGS['connect_timeout']
+            )
+            cls.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return cls.session
+
+    @classmethod
+    async def close_session(cls):
+        if cls.session is not None and not cls.session.closed:
+            await cls.session.close()
+        cls.session = None
+
+    @staticmethod
+    async def _fetch_json(method: str, url: str, **kwargs):
+        """Return the decoded JSON body, or None if the explorer did not answer with 200."""
+        session = await BlockchainVerifier.open_session()
+        provider = urlsplit(url).hostname or "unknown"
+        started = time.perf_counter()
+        status = "error"
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                status = str(response.status)
+                if response.status != 200:
+                    return None
+                return await response.json(content_type=None)
+        except asyncio.TimeoutError:
+            status = "timeout"
+            raise
+        finally:
+            explorer_request_seconds.observe(time.perf_counter() - started, provider=provider, status=status)
+
+    @staticmethod
+    async def _fetch_transaction(network: str, tx_id: str, url: str, is_confirmed, **kwargs):
+        """
+        Fetch a transaction through the cache.
+        `is_confirmed(data)` decides whether the answer is final (cached for long)
+        or still pending (cached briefly so retries pick up new confirmations).
+        """
+        key = (network, tx_id)
+        found, data = BlockchainVerifier.transaction_cache.get(key)
+        if found:
+            return data
+
+        data = await BlockchainVerifier._fetch_json("GET", url, **kwargs)
+        if data is None:
+            ttl = TRANSACTION_CACHE_SETTINGS['not_found_ttl']
+        elif is_confirmed(data):
+            ttl = TRANSACTION_CACHE_SETTINGS['confirmed_ttl']
+        else:
+            ttl = TRANSACTION_CACHE_SETTINGS['pending_ttl']
+        BlockchainVerifier.transaction_cache.put(key, data, ttl)
+        return data
+
     @staticmethod
     async def verify_transaction(crypto_type: str, transaction_id: str, expected_amount: float) -> bool:
         """
@@ -10,6 +193,7 @@ class BlockchainVerifier:
         Returns True if the transaction is valid and matches the expected amount.
         """
         if crypto_type not in CRYPTO_ADDRESSES:
+            verifications.inc(network="unknown", outcome="unsupported")
             return False
 
         crypto_info = CRYPTO_ADDRESSES[crypto_type]
@@ -19,18 +203,27 @@ class BlockchainVerifier:
 
         try:
             if network == 'BTC':
-                return await BlockchainVerifier._verify_btc_transaction(transaction_id, address, expected_amount, min_confirmations)
+                verified = await BlockchainVerifier._verify_btc_transaction(transaction_id, address, expected_amount, min_confirmations)
             elif network == 'ETH':
-                return await BlockchainVerifier._verify_eth_transaction(transaction_id, address, expected_amount, min_confirmations)
+                verified = await BlockchainVerifier._verify_eth_transaction(transaction_id, address, expected_amount, min_confirmations)
             elif network == 'LTC':
-                return await BlockchainVerifier._verify_ltc_transaction(transaction_id, address, expected_amount, min_confirmations)
+                verified = await BlockchainVerifier._verify_ltc_transaction(transaction_id, address, expected_amount, min_confirmations)
             elif network == 'SOL':
-                return await BlockchainVerifier._verify_sol_transaction(transaction_id, address, expected_amount, min_confirmations)
+                verified = await BlockchainVerifier._verify_sol_transaction(transaction_id, address, expected_amount, min_confirmations)
             else:
+                verifications.inc(network=network, outcome="unsupported")
                 return False
         except Exception as e:
             print(f"Error verifying {network} transaction: {e}")
+            verifications.inc(network=network, outcome="error")
             return False
+        verifications.inc(network=network, outcome="verified" if verified else "rejected")
+        return verified
+
+    @staticmethod
+    def _btc_confirmed(data: dict) -> bool:
+        # Mempool transactions carry "block": {"mempool": <ts>}, only mined ones have a height
+        return 'height' in (data.get('block') or {}) and not data.get('deleted')
 
     @staticmethod
     async def _verify_btc_transaction(tx_id: str, address: str, expected_amount: float, min_confirmations: int) -> bool:
@@ -38,21 +231,15 @@ class BlockchainVerifier:
         try:
             # Get transaction details from blockchain.info
             tx_url = f"https://api.blockchain.info/haskoin-store/btc/transaction/{tx_id}"
-            tx_response = requests.get(tx_url)
-            if tx_response.status_code != 200:
+            tx_data = await BlockchainVerifier._fetch_transaction("BTC", tx_id, tx_url, BlockchainVerifier._btc_confirmed)
+            if tx_data is None:
                 return False
             
-            tx_data = tx_response.json()
-            
-            # Get current BTC price from bitaps
-            price_url = "https://bitaps.com/js/get/update"
-            price_response = requests.post(price_url)
-            if price_response.status_code != 200:
+            # Get current BTC price
+            btc_price = await PriceOracle.get_price("BTC")
+            if btc_price is None:
                 return False
             
-            price_data = price_response.json()
-            btc_price = float(price_data['average']['dollars'].replace(" ", "") + "." + price_data['average']['cents'])
-            
             # Verify recipient and amount
             for output in tx_data['outputs']:
                 if output['address'] == address:
@@ -64,7 +251,7 @@ class BlockchainVerifier:
                     if expected_amount <= amount_usd:
                         print("here 2")
                         # Verify confirmation status
-                        if 'block' in tx_data and not tx_data['deleted']:
+                        if BlockchainVerifier._btc_confirmed(tx_data):
                             print("here 3")
                             return True
                         
@@ -80,12 +267,13 @@ class BlockchainVerifier:
         try:
             # Use Ethplorer API
             url = f"https://api.ethplorer.io/getTxInfo/{tx_id}?apiKey=freekey"
-            response = requests.get(url)
-            if response.status_code != 200:
+            data = await BlockchainVerifier._fetch_transaction(
+                "ETH", tx_id, url,
+                lambda data: data.get('success') is not False and data.get('confirmations', 0) >= max(min_confirmations, 1)
+            )
+            if data is None:
                 return False
             
-            data = response.json()
-            
             # Check if transaction was successful
             if data["success"] == False:
                 return False
@@ -131,21 +319,18 @@ class BlockchainVerifier:
         try:
             # Get transaction details from litecoinspace.org
             tx_url = f"https://litecoinspace.org/api/tx/{tx_id}"
-            tx_response = requests.get(tx_url)
-            if tx_response.status_code != 200:
+            tx_data = await BlockchainVerifier._fetch_transaction(
+                "LTC", tx_id, tx_url,
+                lambda data: data.get('status', {}).get('confirmed', False)
+            )
+            if tx_data is None:
                 return False
             
-            tx_data = tx_response.json()
-            
-            # Get current LTC price from bitaps
-            price_url = "https://ltc.bitaps.com/js/get/update"
-            price_response = requests.post(price_url)
-            if price_response.status_code != 200:
+            # Get current LTC price
+            ltc_price = await PriceOracle.get_price("LTC")
+            if ltc_price is None:
                 return False
             
-            price_data = price_response.json()
-            ltc_price = float(price_data['average']['dollars'].replace(" ", "") + "." + price_data['average']['cents'])
-            
             # Verify recipient and amount
             for output in tx_data['vout']:
                 if output['scriptpubkey_address'] == address:
@@ -178,11 +363,14 @@ class BlockchainVerifier:
         }
         
         url = f"https://api.solscan.io/transaction?tx={tx_id}"
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
+        data = await BlockchainVerifier._fetch_transaction(
+            "SOL", tx_id, url,
+            lambda data: data.get('success') and data['data'].get('finalized', False),
+            headers=headers
+        )
+        if data is None:
             return False
         
-        data = response.json()
         if not data['success']:
             return False
         
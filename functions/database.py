@@ -1,37 +1,170 @@
 import sqlite3
 import json
 import os
+import time
+import asyncio
+import functools
+import threading
+from collections import Counter
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
 
 from config import *
+from functions.metrics import db_call_seconds, db_calls, charge_db_time
 
 TRX_IDS_FILE = os.path.join(os.path.dirname(DATABASE_PATH), "trx_ids.json")
 
+# Outcomes of purchase_slot
+PURCHASE_OK = "purchased"
+PURCHASE_SLOT_MISSING = "slot_missing"
+PURCHASE_SLOT_OCCUPIED = "slot_occupied"
+PURCHASE_ALREADY_RENTING = "already_renting"
+PURCHASE_INSUFFICIENT_POINTS = "insufficient_points"
+PURCHASE_BUSY = "busy"
+PURCHASE_ERROR = "error"
+
+class PurchaseResult(NamedTuple):
+    status: str
+    occupied_till: int = 0      # End of the rental when purchased
+    points_left: int = None     # Buyer's balance after the purchase, or at the time it failed
+
+    @property
+    def ok(self) -> bool:
+        return self.status == PURCHASE_OK
+
+_local = threading.local()
+
 def db_connection():
-    conn = sqlite3.connect(database=DATABASE_PATH)
+    """Return the long-lived connection owned by the calling thread."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(
+            database=DATABASE_PATH,
+            timeout=STORAGE_PROFILE['busy_timeout'] / 1000,
+            cached_statements=STORAGE_PROFILE['cached_statements']
+        )
+        apply_storage_profile(conn)
+        _local.conn = conn
     return conn
 
-def load_trx_ids() -> set:
-    """Load transaction IDs from the JSON file."""
+# Errors the functions below turn into a False/error result, per (operation, kind)
+error_counts = Counter()
+_error_counts_lock = threading.Lock()
+
+def is_locked(error: Exception) -> bool:
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+def record_error(operation: str, error: Exception):
+    with _error_counts_lock:
+        error_counts[(operation, "locked" if is_locked(error) else type(error).__name__)] += 1
+
+def close_connection():
+    """Close the calling thread's connection, the next db_connection() opens DATABASE_PATH again."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+def apply_storage_profile(conn: sqlite3.Connection):
+    """Apply the PRAGMAs from STORAGE_PROFILE to a freshly opened connection."""
+    conn.execute(f"PRAGMA journal_mode = {STORAGE_PROFILE['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {STORAGE_PROFILE['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(STORAGE_PROFILE['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(STORAGE_PROFILE['mmap_size'])}")
+    conn.execute(f"PRAGMA busy_timeout = {int(STORAGE_PROFILE['busy_timeout'])}")
+
+LEGACY_CHAIN = "legacy"  # Chain recorded for IDs imported from trx_ids.json
+
+def import_trx_ids_json():
+    """One-time import of the old trx_ids.json file into used_transactions."""
     if not os.path.exists(TRX_IDS_FILE):
-        with open(TRX_IDS_FILE, "w") as file:
-            json.dump([], file)
+        return
     with open(TRX_IDS_FILE, "r") as file:
-        return set(json.load(file))
-
-def save_trx_id(trx_id: str) -> bool:
-    """Save a transaction ID to the JSON file."""
-    trx_ids = load_trx_ids()
-    if trx_id in trx_ids:
-        return False  # Transaction ID already exists
-    trx_ids.add(trx_id)
-    with open(TRX_IDS_FILE, "w") as file:
-        json.dump(list(trx_ids), file)
-    return True
-
-def is_transaction_id_used(trx_id: str) -> bool:
-    """Check if a transaction ID has already been used."""
-    trx_ids = load_trx_ids()
-    return trx_id in trx_ids
+        trx_ids = json.load(file)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT OR IGNORE INTO used_transactions (chain, tx_id, claimed_at)
+            VALUES (?, ?, 0)
+        """, [(LEGACY_CHAIN, trx_id) for trx_id in trx_ids])
+    os.replace(TRX_IDS_FILE, TRX_IDS_FILE + ".imported")
+
+def save_trx_id(trx_id: str, chain: str = LEGACY_CHAIN) -> bool:
+    """Mark a transaction ID as used. Returns False if it was already used."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT OR IGNORE INTO used_transactions (chain, tx_id, claimed_at)
+            VALUES (?, ?, ?)
+        """, (chain, trx_id, int(time.time())))
+        return cursor.rowcount == 1
+
+def is_transaction_id_used(trx_id: str, chain: str = None) -> bool:
+    """Check if a transaction ID has already been used on `chain` (or on any chain if not given)."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        if chain is None:
+            cursor.execute("SELECT 1 FROM used_transactions WHERE tx_id = ?", (trx_id,))
+        else:
+            cursor.execute("""
+                SELECT 1 FROM used_transactions 
+                WHERE chain IN (?, ?) AND tx_id = ?
+            """, (chain, LEGACY_CHAIN, trx_id))
+        return cursor.fetchone() is not None
+
+def record_points(cursor: sqlite3.Cursor, guild_id: int, user_id: int, delta: int, reason: str, reference: str = None, actor_id: int = None):
+    """
+    Append a ledger entry for a balance change made with `cursor`.
+    Call it after updating users.points, inside the same transaction, so the
+    entry and the materialized balance always commit together.
+    """
+    cursor.execute("SELECT points FROM users WHERE guild_id = ? AND id = ?", (guild_id, user_id))
+    balance = cursor.fetchone()[0]
+    cursor.execute("""
+        INSERT INTO points_ledger (guild_id, user_id, delta, balance, reason, reference, actor_id, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (guild_id, user_id, delta, balance, reason, reference, actor_id, int(time.time())))
+
+def claim_transaction(chain: str, trx_id: str, guild_id: int, user_id: int, points: int, ticket_id: int = None, actor_id: int = None) -> bool:
+    """
+    Mark a transaction as used and credit its points in `guild_id` in one transaction.
+    If `ticket_id` is given, that ticket is marked completed in the same transaction.
+    `actor_id` is the admin who approved the payment, None when it was approved automatically.
+    Returns False if the transaction was already claimed.
+    """
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            SELECT 1 FROM used_transactions 
+            WHERE chain IN (?, ?) AND tx_id = ?
+        """, (chain, LEGACY_CHAIN, trx_id))
+        if cursor.fetchone():
+            conn.rollback()
+            return False
+
+        cursor.execute("""
+            INSERT INTO used_transactions (chain, tx_id, user_id, points, ticket_id, claimed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (chain, trx_id, user_id, points, ticket_id, int(time.time())))
+        cursor.execute("""
+            INSERT INTO users (guild_id, id, points) 
+            VALUES (?, ?, ?)
+            ON CONFLICT(guild_id, id) DO UPDATE SET points = points + excluded.points
+        """, (guild_id, user_id, points))
+        record_points(cursor, guild_id, user_id, points, "payment", f"tx:{chain}:{trx_id}", actor_id)
+        if ticket_id is not None:
+            cursor.execute("UPDATE tickets SET status = 'completed' WHERE id = ?", (ticket_id,))
+        conn.commit()
+        return True
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        return False
+    except Exception as e:
+        conn.rollback()
+        record_error("claim_transaction", e)
+        raise
 
 def setup_crypto_payment_methods():
     with db_connection() as conn:
@@ -51,11 +184,44 @@ def setup_tables():
     with db_connection() as conn:
         cursor = conn.cursor()
 
+        # Points and admin flags are kept per guild
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS users (
-                id INT PRIMARY KEY NOT NULL,
+                guild_id INT NOT NULL DEFAULT 0,
+                id INT NOT NULL,
                 points INT NOT NULL DEFAULT 0,
-                admin BOOLEAN DEFAULT 0
+                admin BOOLEAN DEFAULT 0,
+                PRIMARY KEY (guild_id, id)
+            )
+        """)
+
+        # Users from before guild support were keyed by id alone, rebuild them under guild 0
+        cursor.execute("PRAGMA table_info(users)")
+        if "guild_id" not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE users RENAME TO users_single_guild")
+            cursor.execute("""
+                CREATE TABLE users (
+                    guild_id INT NOT NULL DEFAULT 0,
+                    id INT NOT NULL,
+                    points INT NOT NULL DEFAULT 0,
+                    admin BOOLEAN DEFAULT 0,
+                    PRIMARY KEY (guild_id, id)
+                )
+            """)
+            cursor.execute("""
+                INSERT INTO users (guild_id, id, points, admin)
+                SELECT 0, id, points, admin FROM users_single_guild
+            """)
+            cursor.execute("DROP TABLE users_single_guild")
+
+        # Per-guild overrides of the ticket and shop settings in config.py, NULL keeps the default
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS guild_settings (
+                guild_id INT PRIMARY KEY NOT NULL,
+                ticket_category_id INT,
+                ticket_admin_roles TEXT,
+                points_prices TEXT,
+                supreme_user INT
             )
         """)
 
@@ -79,6 +245,89 @@ def setup_tables():
                 type TEXT NOT NULL)
         """)
 
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS used_transactions (
+                chain TEXT NOT NULL,
+                tx_id TEXT NOT NULL,
+                user_id INT,
+                points INT,
+                ticket_id INT,
+                claimed_at INT NOT NULL,
+                PRIMARY KEY (chain, tx_id)
+            )
+        """)
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_used_transactions_tx_id
+            ON used_transactions (tx_id)
+        """)
+
+        # Every balance change, users.points is the materialized sum per user
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS points_ledger (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INT NOT NULL DEFAULT 0,
+                user_id INT NOT NULL,
+                delta INT NOT NULL,
+                balance INT NOT NULL,
+                reason TEXT NOT NULL,
+                reference TEXT,
+                actor_id INT,
+                created_at INT NOT NULL
+            )
+        """)
+
+        try:
+            cursor.execute("ALTER TABLE points_ledger ADD COLUMN guild_id INT NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError:
+            # Column already exists, ignore error
+            pass
+
+        cursor.execute("DROP INDEX IF EXISTS idx_points_ledger_user")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_points_ledger_guild_user
+            ON points_ledger (guild_id, user_id, id)
+        """)
+        # A guild's entries since a checkpoint, for per-guild audits
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_points_ledger_guild
+            ON points_ledger (guild_id, id)
+        """)
+
+        # Snapshots of every balance, so audits and point-in-time queries only replay what came after
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS points_checkpoints (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ledger_id INT NOT NULL,
+                created_at INT NOT NULL
+            )
+        """)
+
+        # Checkpoints taken before guild support can't tell guilds apart, they are dropped and taken again
+        cursor.execute("PRAGMA table_info(points_checkpoint_balances)")
+        columns = [row[1] for row in cursor.fetchall()]
+        if columns and "guild_id" not in columns:
+            cursor.execute("DROP TABLE points_checkpoint_balances")
+            cursor.execute("DELETE FROM points_checkpoints")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS points_checkpoint_balances (
+                checkpoint_id INT NOT NULL,
+                guild_id INT NOT NULL,
+                user_id INT NOT NULL,
+                balance INT NOT NULL,
+                PRIMARY KEY (checkpoint_id, guild_id, user_id)
+            )
+        """)
+
+        # Balances from before the ledger existed become its opening entries
+        cursor.execute("SELECT 1 FROM points_ledger LIMIT 1")
+        if not cursor.fetchone():
+            cursor.execute("""
+                INSERT INTO points_ledger (guild_id, user_id, delta, balance, reason, created_at)
+                SELECT guild_id, id, points, points, 'opening_balance', ? FROM users WHERE points != 0
+            """, (int(time.time()),))
+
         # Add pings_left column if it doesn't exist
         try:
             cursor.execute("ALTER TABLE slots ADD COLUMN pings_left INT DEFAULT 3")
@@ -86,61 +335,84 @@ def setup_tables():
             # Column already exists, ignore error
             pass
 
+        # IDs of the messages currently rendered in each slot channel, and the guild the slot belongs to
+        for column in ("claimed_message_id INT", "info_message_id INT", "available_message_id INT", "guild_id INT NOT NULL DEFAULT 0"):
+            try:
+                cursor.execute(f"ALTER TABLE slots ADD COLUMN {column}")
+            except sqlite3.OperationalError:
+                # Column already exists, ignore error
+                pass
+
+        # Expiry only ever looks at occupied rows, ordered by end time
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_slots_occupied_till
+            ON slots (occupied_till) WHERE occupied = 1
+        """)
+
+        # One-slot-per-user check, and every per-guild slot listing
+        cursor.execute("DROP INDEX IF EXISTS idx_slots_occupied_by")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_slots_guild_occupied_by
+            ON slots (guild_id, occupied_by)
+        """)
+
         cursor.close()
         
     # Setup crypto payment methods
     setup_crypto_payment_methods()
+    import_trx_ids_json()
 
-def get_points(id: int):
-    add_user(id=id)
+def get_points(guild_id: int, id: int):
+    add_user(guild_id=guild_id, id=id)
     with db_connection() as conn:
         cursor = conn.cursor()
 
-        cursor.execute(f"""
-            SELECT points FROM users WHERE id = {id}
-        """)
+        cursor.execute("SELECT points FROM users WHERE guild_id = ? AND id = ?", (guild_id, id))
         return cursor.fetchone()[0]
 
 
-def add_points(id: int, points: int) -> bool:
-    add_user(id=id)
+def add_points(guild_id: int, id: int, points: int, reason: str = "adjustment", reference: str = None, actor_id: int = None) -> bool:
+    add_user(guild_id=guild_id, id=id)
     with db_connection() as conn:
         try:
             cursor = conn.cursor()
 
-            cursor.execute(f"""
-                UPDATE users SET points = points + {points} WHERE id = {id}
-            """)
+            cursor.execute("UPDATE users SET points = points + ? WHERE guild_id = ? AND id = ?", (points, guild_id, id))
+            record_points(cursor, guild_id, id, points, reason, reference, actor_id)
             return True
-        except:
+        except Exception as e:
+            conn.rollback()
+            record_error("add_points", e)
             return False
         
-def add_user(id: int) -> bool:
+def add_user(guild_id: int, id: int) -> bool:
     with db_connection() as conn:
         try:
             cursor = conn.cursor()
 
-            cursor.execute(f"""
-                INSERT OR IGNORE INTO users (id) VALUES ({id})
-            """)
+            cursor.execute("INSERT OR IGNORE INTO users (guild_id, id) VALUES (?, ?)", (guild_id, id))
             return True
         except:
             return False
         
-def user_admin(id: int) -> bool:
+def user_admin(guild_id: int, id: int) -> bool:
     if id == SUPREME_USER:
         return True
     
-    add_user(id=id)
+    add_user(guild_id=guild_id, id=id)
     with db_connection() as conn:
         try:
             cursor = conn.cursor()
 
-            cursor.execute(f"""
-                SELECT admin FROM users WHERE id = {id}
-            """)
+            # The guild's own supreme user (from guild_settings) is an admin there too
+            cursor.execute("""
+                SELECT admin, (SELECT supreme_user FROM guild_settings WHERE guild_id = ?) 
+                FROM users WHERE guild_id = ? AND id = ?
+            """, (guild_id, guild_id, id))
 
             value = cursor.fetchone()
+            if value[1] == id:
+                return True
             if value[0] == 0:
                 return False
             elif value[0] == 1:
@@ -148,34 +420,122 @@ def user_admin(id: int) -> bool:
         except:
             return False
 
-def set_admin(id: int, is_admin: bool) -> bool:
-    add_user(id=id)
+def set_admin(guild_id: int, id: int, is_admin: bool) -> bool:
+    add_user(guild_id=guild_id, id=id)
     with db_connection() as conn:
         try:
             cursor = conn.cursor()
-            cursor.execute(f"""
-                UPDATE users SET admin = {1 if is_admin else 0} WHERE id = {id}
-            """)
+            cursor.execute("UPDATE users SET admin = ? WHERE guild_id = ? AND id = ?", (1 if is_admin else 0, guild_id, id))
             return True
         except:
             return False
 
-def get_admins() -> list:
+def get_admins(guild_id: int) -> list:
     with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT id FROM users WHERE admin = 1
-        """)
+            SELECT id FROM users WHERE guild_id = ? AND admin = 1
+        """, (guild_id,))
         return [row[0] for row in cursor.fetchall()]
 
-def add_slot(channel_id: int, price_points: int, default_name: str) -> tuple:
+def get_guild_settings(guild_id: int) -> tuple:
+    """Raw overrides of a guild: (ticket_category_id, ticket_admin_roles, points_prices, supreme_user), None if it has none."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT ticket_category_id, ticket_admin_roles, points_prices, supreme_user 
+            FROM guild_settings WHERE guild_id = ?
+        """, (guild_id,))
+        return cursor.fetchone()
+
+def set_guild_settings(guild_id: int, ticket_category_id: int = None, ticket_admin_roles: str = None, points_prices: str = None, supreme_user: int = None) -> bool:
     with db_connection() as conn:
         try:
             cursor = conn.cursor()
-            cursor.execute(f"""
-                INSERT INTO slots (id, points, default_name) 
-                VALUES ({channel_id}, {price_points}, '{default_name}')
-            """)
+            cursor.execute("""
+                INSERT INTO guild_settings (guild_id, ticket_category_id, ticket_admin_roles, points_prices, supreme_user)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(guild_id) DO UPDATE SET 
+                    ticket_category_id = excluded.ticket_category_id,
+                    ticket_admin_roles = excluded.ticket_admin_roles,
+                    points_prices = excluded.points_prices,
+                    supreme_user = excluded.supreme_user
+            """, (guild_id, ticket_category_id, ticket_admin_roles, points_prices, supreme_user))
+            return True
+        except Exception as e:
+            conn.rollback()
+            record_error("set_guild_settings", e)
+            return False
+
+def adopt_legacy_rows(guild_id: int = None, slot_guilds: dict = None) -> int:
+    """
+    Move the rows written before guild support (guild_id 0) to their guild.
+    Slots go to the guild of their channel from `slot_guilds` ({slot_id: guild_id}),
+    everything else (and slots whose channel is gone) to `guild_id` when it is given.
+    A user who already has a row in `guild_id` keeps it, with the legacy points
+    added and a 'legacy_merge' ledger entry recording the merge.
+    Returns how many rows were moved, 0 once there is nothing left to adopt.
+    """
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        moved = 0
+        for slot_id, slot_guild_id in (slot_guilds or {}).items():
+            cursor.execute("UPDATE slots SET guild_id = ? WHERE id = ? AND guild_id = 0", (slot_guild_id, slot_id))
+            moved += cursor.rowcount
+        if guild_id is None:
+            conn.commit()
+            return moved
+
+        # Users with a row in both: sum them into the guild's row
+        cursor.execute("""
+            SELECT legacy.id, legacy.points FROM users AS legacy 
+            JOIN users AS current ON current.guild_id = ? AND current.id = legacy.id 
+            WHERE legacy.guild_id = 0
+        """, (guild_id,))
+        merged = cursor.fetchall()
+        cursor.execute("""
+            INSERT INTO users (guild_id, id, points, admin) 
+            SELECT ?, id, points, admin FROM users WHERE guild_id = 0 
+            ON CONFLICT(guild_id, id) DO UPDATE SET points = points + excluded.points, admin = MAX(admin, excluded.admin)
+        """, (guild_id,))
+        cursor.execute("DELETE FROM users WHERE guild_id = 0")
+        moved += cursor.rowcount
+        cursor.execute("""
+            INSERT INTO points_checkpoint_balances (checkpoint_id, guild_id, user_id, balance) 
+            SELECT checkpoint_id, ?, user_id, balance FROM points_checkpoint_balances WHERE guild_id = 0 
+            ON CONFLICT(checkpoint_id, guild_id, user_id) DO UPDATE SET balance = balance + excluded.balance
+        """, (guild_id,))
+        cursor.execute("DELETE FROM points_checkpoint_balances WHERE guild_id = 0")
+        moved += cursor.rowcount
+
+        for table in ("points_ledger", "slots", "tickets", "payment_tickets"):
+            try:
+                cursor.execute(f"UPDATE {table} SET guild_id = ? WHERE guild_id = 0", (guild_id,))
+            except sqlite3.OperationalError:
+                # Table not created yet, nothing to adopt
+                continue
+            moved += cursor.rowcount
+
+        # The legacy entries moved along, this one marks where the two balances were joined
+        for user_id, points in merged:
+            record_points(cursor, guild_id, user_id, 0, "legacy_merge", f"legacy:{points}")
+        conn.commit()
+        return moved
+    except Exception as e:
+        conn.rollback()
+        record_error("adopt_legacy_rows", e)
+        raise
+
+def add_slot(guild_id: int, channel_id: int, price_points: int, default_name: str) -> tuple:
+    with db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO slots (id, guild_id, points, default_name) 
+                VALUES (?, ?, ?, ?)
+            """, (channel_id, guild_id, price_points, default_name))
             return (price_points, default_name, False, 0, 0, SLOT_CONFIG['default_pings'])
         except:
             return None
@@ -188,77 +548,147 @@ def get_slots() -> list:
         """)
         return [row[0] for row in cursor.fetchall()]
 
+def get_all_slots() -> list:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, points, default_name, occupied, occupied_by, occupied_till, pings_left,
+                   claimed_message_id, info_message_id, available_message_id, guild_id
+            FROM slots
+        """)
+        return cursor.fetchall()
+
+def get_occupied_slots() -> list:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, points, default_name, occupied, occupied_by, occupied_till, pings_left 
+            FROM slots 
+            WHERE occupied = 1 AND occupied_till > 0
+            ORDER BY occupied_till
+        """)
+        return cursor.fetchall()
+
+def get_expired_slots(now: int) -> list:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, points, default_name, occupied, occupied_by, occupied_till, pings_left 
+            FROM slots 
+            WHERE occupied = 1 AND occupied_till > 0 AND occupied_till <= ?
+            ORDER BY occupied_till
+        """, (now,))
+        return cursor.fetchall()
+
 def remove_slot(channel_id: int) -> bool:
     with db_connection() as conn:
         try:
             cursor = conn.cursor()
-            cursor.execute(f"""
-                DELETE FROM slots WHERE id = {channel_id}
-            """)
+            cursor.execute("DELETE FROM slots WHERE id = ?", (channel_id,))
             return True
         except:
             return False
 
-def get_user_slot(user_id: int) -> tuple:
+def get_user_slot(guild_id: int, user_id: int) -> tuple:
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(f"""
+        cursor.execute("""
             SELECT id, occupied_till FROM slots 
-            WHERE occupied_by = {user_id}
-        """)
+            WHERE guild_id = ? AND occupied_by = ?
+        """, (guild_id, user_id))
         return cursor.fetchone()
 
 def get_slot_info(slot_id: int) -> tuple:
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(f"""
+        cursor.execute("""
             SELECT points, default_name, occupied, occupied_by, occupied_till, pings_left 
-            FROM slots WHERE id = {slot_id}
-        """)
+            FROM slots WHERE id = ?
+        """, (slot_id,))
         return cursor.fetchone()
 
-def purchase_slot(slot_id: int, user_id: int, duration_seconds: int, points_cost: int) -> bool:
+def get_slot_messages(slot_id: int) -> tuple:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT claimed_message_id, info_message_id, available_message_id 
+            FROM slots WHERE id = ?
+        """, (slot_id,))
+        return cursor.fetchone()
+
+def set_slot_messages(slot_id: int, claimed_message_id: int = None, info_message_id: int = None, available_message_id: int = None) -> bool:
     with db_connection() as conn:
         try:
             cursor = conn.cursor()
-            # Check if user has enough points
-            cursor.execute(f"SELECT points FROM users WHERE id = {user_id}")
-            user_points = cursor.fetchone()
-            if not user_points or user_points[0] < points_cost:
-                return False
-                
-            # Check if slot is available
-            cursor.execute(f"SELECT occupied FROM slots WHERE id = {slot_id}")
-            slot_status = cursor.fetchone()
-            if not slot_status or slot_status[0]:
-                return False
-                
-            # Calculate end time
-            import time
-            end_time = int(time.time()) + duration_seconds
-            
-            # Update slot status
-            cursor.execute(f"""
+            cursor.execute("""
                 UPDATE slots 
-                SET occupied = 1, 
-                    occupied_by = {user_id}, 
-                    occupied_till = {end_time},
-                    pings_left = 3 
-                WHERE id = {slot_id}
-            """)
-            
-            # Deduct points from user
-            cursor.execute(f"""
-                UPDATE users 
-                SET points = points - {points_cost} 
-                WHERE id = {user_id}
-            """)
-            
+                SET claimed_message_id = ?, 
+                    info_message_id = ?, 
+                    available_message_id = ?
+                WHERE id = ?
+            """, (claimed_message_id, info_message_id, available_message_id, slot_id))
             return True
         except:
             return False
 
-def create_payment_ticket(user_id: int, points_amount: int, price_eur: float) -> int:
+def purchase_slot(slot_id: int, user_id: int, duration_seconds: int, points_cost: int) -> PurchaseResult:
+    """
+    Rent a slot in one immediate transaction.
+    The slot is only taken while it's free and the buyer rents nothing else in
+    the slot's guild, and points are only deducted from the buyer's balance in
+    that guild while it covers the cost. If either
+    conditional UPDATE matches no row, the purchase rolls back and the result
+    says why.
+    """
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT guild_id, occupied FROM slots WHERE id = ?", (slot_id,))
+        slot_status = cursor.fetchone()
+        if not slot_status:
+            conn.rollback()
+            return PurchaseResult(PURCHASE_SLOT_MISSING)
+        guild_id = slot_status[0]
+
+        end_time = int(time.time()) + duration_seconds
+        cursor.execute("""
+            UPDATE slots 
+            SET occupied = 1, 
+                occupied_by = ?, 
+                occupied_till = ?,
+                pings_left = ? 
+            WHERE id = ? AND occupied = 0
+              AND NOT EXISTS (SELECT 1 FROM slots WHERE guild_id = ? AND occupied = 1 AND occupied_by = ?)
+        """, (user_id, end_time, SLOT_CONFIG['default_pings'], slot_id, guild_id, user_id))
+        if cursor.rowcount == 0:
+            conn.rollback()
+            if slot_status[1]:
+                return PurchaseResult(PURCHASE_SLOT_OCCUPIED)
+            return PurchaseResult(PURCHASE_ALREADY_RENTING)
+
+        cursor.execute("""
+            UPDATE users 
+            SET points = points - ? 
+            WHERE guild_id = ? AND id = ? AND points >= ?
+        """, (points_cost, guild_id, user_id, points_cost))
+        debited = cursor.rowcount
+        cursor.execute("SELECT points FROM users WHERE guild_id = ? AND id = ?", (guild_id, user_id))
+        user_points = cursor.fetchone()
+        points_left = user_points[0] if user_points else 0
+        if not debited:
+            conn.rollback()
+            return PurchaseResult(PURCHASE_INSUFFICIENT_POINTS, points_left=points_left)
+
+        record_points(cursor, guild_id, user_id, -points_cost, "slot_purchase", f"slot:{slot_id}", user_id)
+        conn.commit()
+        return PurchaseResult(PURCHASE_OK, end_time, points_left)
+    except Exception as e:
+        conn.rollback()
+        record_error("purchase_slot", e)
+        return PurchaseResult(PURCHASE_BUSY if is_locked(e) else PURCHASE_ERROR)
+
+def create_payment_ticket(guild_id: int, user_id: int, points_amount: int, price_eur: float) -> int:
     with db_connection() as conn:
         try:
             cursor = conn.cursor()
@@ -273,14 +703,19 @@ def create_payment_ticket(user_id: int, points_amount: int, price_eur: float) ->
                     completed_at INT
                 )
             """)
+            try:
+                cursor.execute("ALTER TABLE payment_tickets ADD COLUMN guild_id INT NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                # Column already exists, ignore error
+                pass
             
             import time
             current_time = int(time.time())
             
-            cursor.execute(f"""
-                INSERT INTO payment_tickets (user_id, points_amount, price_eur, created_at)
-                VALUES ({user_id}, {points_amount}, {price_eur}, {current_time})
-            """)
+            cursor.execute("""
+                INSERT INTO payment_tickets (guild_id, user_id, points_amount, price_eur, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (guild_id, user_id, points_amount, price_eur, current_time))
             
             return cursor.lastrowid
         except:
@@ -289,9 +724,7 @@ def create_payment_ticket(user_id: int, points_amount: int, price_eur: float) ->
 def get_payment_ticket(ticket_id: int) -> tuple:
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(f"""
-            SELECT * FROM payment_tickets WHERE id = {ticket_id}
-        """)
+        cursor.execute("SELECT * FROM payment_tickets WHERE id = ?", (ticket_id,))
         return cursor.fetchone()
 
 def complete_payment_ticket(ticket_id: int) -> bool:
@@ -302,25 +735,26 @@ def complete_payment_ticket(ticket_id: int) -> bool:
             current_time = int(time.time())
             
             # Get ticket info
-            cursor.execute(f"SELECT user_id, points_amount, status FROM payment_tickets WHERE id = {ticket_id}")
+            cursor.execute("SELECT user_id, points_amount, status, guild_id FROM payment_tickets WHERE id = ?", (ticket_id,))
             ticket = cursor.fetchone()
             if not ticket or ticket[2] != 'pending':
                 return False
                 
             # Update ticket status
-            cursor.execute(f"""
+            cursor.execute("""
                 UPDATE payment_tickets 
                 SET status = 'completed', 
-                    completed_at = {current_time} 
-                WHERE id = {ticket_id}
-            """)
+                    completed_at = ? 
+                WHERE id = ?
+            """, (current_time, ticket_id))
             
             # Add points to user
-            cursor.execute(f"""
-                INSERT INTO users (id, points) 
-                VALUES ({ticket[0]}, {ticket[1]})
-                ON CONFLICT(id) DO UPDATE SET points = points + {ticket[1]}
-            """)
+            cursor.execute("""
+                INSERT INTO users (guild_id, id, points) 
+                VALUES (?, ?, ?)
+                ON CONFLICT(guild_id, id) DO UPDATE SET points = points + excluded.points
+            """, (ticket[3], ticket[0], ticket[1]))
+            record_points(cursor, ticket[3], ticket[0], ticket[1], "payment", f"payment_ticket:{ticket_id}")
             
             return True
         except:
@@ -352,7 +786,25 @@ def create_ticket_tables():
             )
         """)
 
-def create_ticket(channel_id: int, user_id: int) -> int:
+        # Columns used by background payment verification, and the guild the ticket belongs to
+        for column in ("verify_attempts INT DEFAULT 0", "verify_started_at INT", "next_check_at INT", "guild_id INT NOT NULL DEFAULT 0"):
+            try:
+                cursor.execute(f"ALTER TABLE tickets ADD COLUMN {column}")
+            except sqlite3.OperationalError:
+                # Column already exists, ignore error
+                pass
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tickets_verifying
+            ON tickets (next_check_at) WHERE status = 'verifying'
+        """)
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tickets_guild_user
+            ON tickets (guild_id, user_id)
+        """)
+
+def create_ticket(guild_id: int, channel_id: int, user_id: int) -> int:
     with db_connection() as conn:
         try:
             cursor = conn.cursor()
@@ -360,9 +812,9 @@ def create_ticket(channel_id: int, user_id: int) -> int:
             current_time = int(time.time())
             
             cursor.execute("""
-                INSERT INTO tickets (channel_id, user_id, created_at)
-                VALUES (?, ?, ?)
-            """, (channel_id, user_id, current_time))
+                INSERT INTO tickets (guild_id, channel_id, user_id, created_at)
+                VALUES (?, ?, ?, ?)
+            """, (guild_id, channel_id, user_id, current_time))
             
             return cursor.lastrowid
         except:
@@ -383,32 +835,323 @@ def update_ticket_payment(ticket_id: int, points_amount: int, price_eur: float,
         except:
             return False
 
+def set_ticket_package(ticket_id: int, points_amount: int, price_eur: float) -> bool:
+    with db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE tickets 
+                SET points_amount = ?, 
+                    price_eur = ?
+                WHERE id = ?
+            """, (points_amount, price_eur, ticket_id))
+            return True
+        except:
+            return False
+
+def set_ticket_crypto(ticket_id: int, crypto_type: str) -> bool:
+    with db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE tickets SET crypto_type = ? WHERE id = ?", (crypto_type, ticket_id))
+            return True
+        except:
+            return False
+
 def get_ticket_info(ticket_id: int) -> tuple:
     with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,))
         return cursor.fetchone()
 
-def get_user_tickets(user_id: int) -> list:
+def get_user_tickets(guild_id: int, user_id: int) -> list:
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT id, status, created_at FROM tickets WHERE user_id = ?", (user_id,))
+        cursor.execute("SELECT id, status, created_at FROM tickets WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
         return cursor.fetchall()
 
-def is_transaction_id_used(transaction_id: str) -> bool:
-    """Check if a transaction ID has already been used."""
-    trx_ids = load_trx_ids()
-    return transaction_id in trx_ids
+def start_ticket_verification(ticket_id: int, points_amount: int, price_eur: float, crypto_type: str, transaction_id: str) -> bool:
+    """Returns False if the ticket is missing or its payment is already being verified, approved or completed."""
+    with db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            current_time = int(time.time())
+            cursor.execute("""
+                UPDATE tickets 
+                SET points_amount = ?, 
+                    price_eur = ?,
+                    crypto_type = ?,
+                    transaction_id = ?,
+                    status = 'verifying',
+                    verify_attempts = 0,
+                    verify_started_at = ?,
+                    next_check_at = ?
+                WHERE id = ? AND status NOT IN ('verifying', 'verified', 'completed')
+            """, (points_amount, price_eur, crypto_type, transaction_id, current_time, current_time, ticket_id))
+            return cursor.rowcount == 1
+        except:
+            return False
+
+def get_ticket_verification(ticket_id: int) -> tuple:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, channel_id, user_id, points_amount, price_eur, crypto_type, transaction_id, 
+                   status, verify_attempts, verify_started_at, next_check_at, guild_id 
+            FROM tickets WHERE id = ?
+        """, (ticket_id,))
+        return cursor.fetchone()
+
+def get_verifying_tickets() -> list:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, next_check_at FROM tickets 
+            WHERE status = 'verifying'
+            ORDER BY next_check_at
+        """)
+        return cursor.fetchall()
+
+def record_verification_attempt(ticket_id: int, attempts: int, next_check_at: int) -> bool:
+    with db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE tickets 
+                SET verify_attempts = ?, 
+                    next_check_at = ?
+                WHERE id = ?
+            """, (attempts, next_check_at, ticket_id))
+            return True
+        except:
+            return False
+
+def set_ticket_status(ticket_id: int, status: str) -> bool:
+    with db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE tickets SET status = ? WHERE id = ?", (status, ticket_id))
+            return True
+        except:
+            return False
 
 def update_slot_pings(slot_id: int, pings_left: int) -> bool:
     with db_connection() as conn:
         try:
             cursor = conn.cursor()
+            cursor.execute("UPDATE slots SET pings_left = ? WHERE id = ?", (pings_left, slot_id))
+            return True
+        except Exception as e:
+            conn.rollback()
+            record_error("update_slot_pings", e)
+            return False
+
+def reset_slot(slot_id: int) -> bool:
+    with db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE slots 
+                SET occupied = 0, 
+                    occupied_by = 0, 
+                    occupied_till = 0,
+                    pings_left = ? 
+                WHERE id = ?
+            """, (SLOT_CONFIG['default_pings'], slot_id))
+            return True
+        except Exception as e:
+            conn.rollback()
+            record_error("reset_slot", e)
+            return False
+
+def expire_slots(slot_ids: list, now: int) -> bool:
+    if not slot_ids:
+        return True
+    with db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            placeholders = ", ".join("?" for _ in slot_ids)
             cursor.execute(f"""
                 UPDATE slots 
-                SET pings_left = {pings_left}
-                WHERE id = {slot_id}
-            """)
+                SET occupied = 0, 
+                    occupied_by = 0, 
+                    occupied_till = 0,
+                    pings_left = ? 
+                WHERE id IN ({placeholders}) AND occupied = 1 AND occupied_till <= ?
+            """, (SLOT_CONFIG['default_pings'], *slot_ids, now))
+            return True
+        except Exception as e:
+            conn.rollback()
+            record_error("expire_slots", e)
+            return False
+
+def set_slot_price(slot_id: int, price_points: int) -> bool:
+    with db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE slots SET points = ? WHERE id = ?", (price_points, slot_id))
             return True
         except:
             return False
+
+def create_points_checkpoint() -> int:
+    """Snapshot every balance at the current end of the ledger. Returns the checkpoint ID, None if nothing changed since the last one."""
+    conn = db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM points_ledger")
+        ledger_id = cursor.fetchone()[0]
+        cursor.execute("SELECT MAX(ledger_id) FROM points_checkpoints")
+        last_ledger_id = cursor.fetchone()[0]
+        if last_ledger_id is not None and last_ledger_id >= ledger_id:
+            conn.rollback()
+            return None
+
+        cursor.execute("""
+            INSERT INTO points_checkpoints (ledger_id, created_at) 
+            VALUES (?, ?)
+        """, (ledger_id, int(time.time())))
+        checkpoint_id = cursor.lastrowid
+        cursor.execute("""
+            INSERT INTO points_checkpoint_balances (checkpoint_id, guild_id, user_id, balance)
+            SELECT ?, guild_id, id, points FROM users WHERE points != 0
+        """, (checkpoint_id,))
+        conn.commit()
+        return checkpoint_id
+    except:
+        conn.rollback()
+        raise
+
+def _checkpoint_before(cursor: sqlite3.Cursor, at: int = None) -> tuple:
+    """(checkpoint_id, ledger_id) of the latest checkpoint taken at or before `at`, (None, 0) if there is none."""
+    if at is None:
+        cursor.execute("SELECT id, ledger_id FROM points_checkpoints ORDER BY id DESC LIMIT 1")
+    else:
+        cursor.execute("""
+            SELECT id, ledger_id FROM points_checkpoints 
+            WHERE created_at <= ? 
+            ORDER BY id DESC LIMIT 1
+        """, (at,))
+    return cursor.fetchone() or (None, 0)
+
+def get_balance_at(guild_id: int, user_id: int, at: int) -> int:
+    """A user's balance in a guild at unix time `at`: the checkpoint before it plus the entries that followed."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        checkpoint_id, ledger_id = _checkpoint_before(cursor, at)
+        cursor.execute("""
+            SELECT balance FROM points_checkpoint_balances 
+            WHERE checkpoint_id = ? AND guild_id = ? AND user_id = ?
+        """, (checkpoint_id, guild_id, user_id))
+        row = cursor.fetchone()
+        cursor.execute("""
+            SELECT COALESCE(SUM(delta), 0) FROM points_ledger 
+            WHERE guild_id = ? AND user_id = ? AND id > ? AND created_at <= ?
+        """, (guild_id, user_id, ledger_id, at))
+        return (row[0] if row else 0) + cursor.fetchone()[0]
+
+def get_points_history(guild_id: int, user_id: int, limit: int = 20) -> list:
+    """Latest ledger entries of a user in a guild: (delta, balance, reason, reference, actor_id, created_at)"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT delta, balance, reason, reference, actor_id, created_at 
+            FROM points_ledger 
+            WHERE guild_id = ? AND user_id = ? 
+            ORDER BY id DESC LIMIT ?
+        """, (guild_id, user_id, limit))
+        return cursor.fetchall()
+
+def audit_points(guild_id: int = None) -> list:
+    """
+    Check users.points against the ledger, replaying only the entries after
+    the latest checkpoint. Returns [(guild_id, user_id, ledger_balance, stored_balance), ...]
+    for every user whose balance doesn't match. With `guild_id` only that guild's
+    checkpoint balances, entries and users are read, through their guild indexes.
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        checkpoint_id, ledger_id = _checkpoint_before(cursor)
+        guild_filter = "" if guild_id is None else "AND guild_id = :guild_id"
+        users_filter = "" if guild_id is None else "AND users.guild_id = :guild_id"
+        cursor.execute(f"""
+            WITH expected AS (
+                SELECT guild_id, user_id, SUM(balance) AS balance FROM (
+                    SELECT guild_id, user_id, balance FROM points_checkpoint_balances 
+                    WHERE checkpoint_id = :checkpoint_id {guild_filter}
+                    UNION ALL
+                    SELECT guild_id, user_id, delta FROM points_ledger 
+                    WHERE id > :ledger_id {guild_filter}
+                )
+                GROUP BY guild_id, user_id
+            )
+            SELECT users.guild_id, users.id, COALESCE(expected.balance, 0), users.points 
+            FROM users LEFT JOIN expected 
+              ON expected.guild_id = users.guild_id AND expected.user_id = users.id
+            WHERE COALESCE(expected.balance, 0) != users.points {users_filter}
+            UNION ALL
+            SELECT expected.guild_id, expected.user_id, expected.balance, 0 
+            FROM expected LEFT JOIN users 
+              ON users.guild_id = expected.guild_id AND users.id = expected.user_id
+            WHERE users.id IS NULL AND expected.balance != 0
+        """, {"checkpoint_id": checkpoint_id, "ledger_id": ledger_id, "guild_id": guild_id})
+        return cursor.fetchall()
+
+
+class AsyncDatabase:
+    """
+    Awaitable access to the functions in this module.
+    Every call runs on one dedicated thread that keeps a single long-lived
+    connection, so coroutines never block the event loop on disk I/O.
+    e.g. `points = await db.get_points(guild_id=guild.id, id=user.id)`
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database")
+        self._wrappers = {}
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        elapsed = [0.0]
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(self._timed, func, elapsed, args, kwargs))
+        finally:
+            charge_db_time(elapsed[0])
+
+    @staticmethod
+    def _timed(func, elapsed: list, args: tuple, kwargs: dict):
+        """Run `func` on the database thread and record how long it took."""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = func(*args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            elapsed[0] = time.perf_counter() - started
+            db_call_seconds.observe(elapsed[0], function=func.__name__)
+            db_calls.inc(function=func.__name__, outcome=outcome)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        wrapper = self._wrappers.get(name)
+        if wrapper is None:
+            func = globals().get(name)
+            if not callable(func) or isinstance(func, type):
+                raise AttributeError(f"functions.database has no query named {name!r}")
+
+            async def wrapper(*args, **kwargs):
+                return await self.run(func, *args, **kwargs)
+
+            wrapper.__name__ = name
+            self._wrappers[name] = wrapper
+        return wrapper
+
+    def close(self):
+        self._executor.submit(close_connection).result()
+        self._executor.shutdown(wait=True)
+
+
+db = AsyncDatabase()
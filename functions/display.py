@@ -1,8 +1,15 @@
 import discord
+import datetime
+import io
+from functools import partial
 from discord.ext import commands
 
 from functions.database import *
 from functions.blockchain import BlockchainVerifier
+from functions.slots import slot_registry
+from functions.outbound import rest_scheduler
+from functions.render import render_cache
+from functions.guilds import guild_settings
 
 async def user_forbidden(interaction: discord.Interaction, ephemeral: bool = False):
     embed = discord.Embed(
@@ -106,6 +113,106 @@ async def admin_selection_embed(interaction: discord.Interaction, options: list[
     view.add_item(discord.ui.Select(placeholder="Select an admin to remove", options=options))
     await interaction.response.send_message(embed=embed, view=view)
 
+async def profile_busy(interaction: discord.Interaction):
+    embed = discord.Embed(
+        title="🟥 Profiler Busy",
+        description="A profile is already running. Please wait for it to finish.",
+        color=discord.Color.red()
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def profile_result(interaction: discord.Interaction, profile):
+    """Send a finished Profile as a followup to the deferred /profile interaction."""
+    hottest = "\n".join(f"`{share:6.1%}` {frame}" for frame, share in profile.hottest()) or "No samples taken."
+    embed = discord.Embed(
+        title="🔬 Profile Complete",
+        description=(
+            f"Sampled the event loop for **{profile.seconds}s**: {profile.samples} stack samples, "
+            f"{profile.task_samples} task snapshots.\n\n**Hottest frames**\n{hottest}"
+        ),
+        color=discord.Color.blue()
+    )
+    embed.set_footer(text="Collapsed stacks, open with speedscope.app or flamegraph.pl")
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    files = [
+        discord.File(io.BytesIO(profile.collapsed().encode()), filename=f"loop-{stamp}.collapsed"),
+        discord.File(io.BytesIO(profile.collapsed_tasks().encode()), filename=f"tasks-{stamp}.collapsed")
+    ]
+    await interaction.followup.send(embed=embed, files=files, ephemeral=True)
+
+async def display_stalls(interaction: discord.Interaction, stalls: list, threshold: float):
+    embed = discord.Embed(
+        title="🐢 Event Loop Stalls",
+        description=f"Times the event loop was blocked for more than {threshold}s, newest first." if stalls else "No stalls recorded since the bot started.",
+        color=discord.Color.blue()
+    )
+    for stall in stalls:
+        # The innermost frames are the blocking call and whoever made it
+        frames = "\n".join(stall.stack[-4:])[-1000:] or "Stack unavailable"
+        embed.add_field(
+            name=f"{stall.duration:.2f}s blocked",
+            value=f"<t:{int(stall.started_at)}:R>\n```{frames}```",
+            inline=False
+        )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def display_shard_health(interaction: discord.Interaction, shards: list):
+    embed = discord.Embed(
+        title="🛰️ Shard Health",
+        description=f"{len(shards)} shard(s) in this process.",
+        color=discord.Color.blue()
+    )
+    for shard_id, latency, closed, guilds, slots, occupied, expiry_running, next_due in shards[:25]:
+        status = "🔴 Disconnected" if closed else "🟢 Connected"
+        expiry = "stopped" if not expiry_running else (f"next <t:{next_due}:R>" if next_due else "idle")
+        embed.add_field(
+            name=f"Shard {shard_id}",
+            value=(
+                f"{status} · {latency * 1000:.0f} ms\n"
+                f"Guilds: {guilds}\nSlots: {slots} ({occupied} occupied)\nExpiry: {expiry}"
+            ),
+            inline=True
+        )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def display_points_history(interaction: discord.Interaction, user: discord.User, points: int, history: list, balance_at: tuple = None):
+    lines = [f"{user.mention} currently has **{points} points**."]
+    if balance_at is not None:
+        at, balance = balance_at
+        lines.append(f"Balance <t:{at}:f>: **{balance} points**.")
+    embed = discord.Embed(title="📒 Points History", description="\n".join(lines), color=discord.Color.blue())
+    for delta, balance, reason, reference, actor_id, created_at in history:
+        details = [f"<t:{created_at}:f>", f"Balance after: {balance}"]
+        if reference:
+            details.append(f"Reference: `{reference}`")
+        if actor_id:
+            details.append(f"By <@{actor_id}>")
+        embed.add_field(name=f"{delta:+} · {reason}", value="\n".join(details), inline=False)
+    if not history:
+        embed.add_field(name="No entries", value="This user has no points history in this server.", inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def display_points_audit(interaction: discord.Interaction, mismatches: list):
+    embed = discord.Embed(
+        title="🧾 Points Audit",
+        description=f"{len(mismatches)} balance(s) differ from the ledger." if mismatches else "Every balance matches the ledger.",
+        color=discord.Color.red() if mismatches else discord.Color.green()
+    )
+    for user_id, ledger, stored in mismatches[:25]:
+        embed.add_field(name=f"Stored {stored} · Ledger {ledger}", value=f"<@{user_id}>", inline=True)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def display_guild_settings(interaction: discord.Interaction, settings, title: str = "⚙️ Server Settings"):
+    category = f"<#{settings.ticket_category_id}>" if settings.ticket_category_id else "Not set"
+    roles = ", ".join(f"<@&{role_id}>" for role_id in settings.ticket_admin_roles) or "None"
+    packages = "\n".join(f"{points} Points - {price}$" for points, price in settings.points_prices.items()) or "None"
+    embed = discord.Embed(title=title, color=discord.Color.blue())
+    embed.add_field(name="Ticket Category", value=category, inline=True)
+    embed.add_field(name="Supreme User", value=f"<@{settings.supreme_user}>", inline=True)
+    embed.add_field(name="Ticket Admin Roles", value=roles, inline=False)
+    embed.add_field(name="Points Packages", value=packages, inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 async def slot_added(interaction: discord.Interaction, channel: discord.TextChannel, price_points: int, default_name: str):
     embed = discord.Embed(
         title="✅ Slot Added",
@@ -185,21 +292,22 @@ async def display_available_slots(interaction: discord.Interaction, slots: list)
     
     await interaction.response.send_message(embed=embed)
 
-async def display_slot_durations(interaction: discord.Interaction, slot_id: int, durations: list):
-    embed = discord.Embed(
-        title=f"⏱️ Available Durations for Slot <#{slot_id}>",
-        description="Select how long you want to rent this slot:",
-        color=discord.Color.blue()
-    )
-    
-    for duration, points in durations:
-        embed.add_field(
-            name=duration,
-            value=f"Cost: {points} points",
-            inline=True
-        )
-    
-    await interaction.response.send_message(embed=embed)
+async def display_slot_durations(interaction: discord.Interaction, slot_id: int, points_per_duration: int):
+    await interaction.response.send_message(embed=render_cache.durations_embed(slot_id, points_per_duration))
+
+class RoutedView(discord.ui.View):
+    """
+    Send-only view for components that are routed by their custom_id.
+    Every item is a DynamicItem registered once when its cog loads, so
+    messages don't need a live view behind them. The view is stopped before
+    it is sent, which keeps discord.py from storing it per message.
+    """
+
+    def __init__(self, *items: discord.ui.Item):
+        super().__init__(timeout=None)
+        for item in items:
+            self.add_item(item)
+        self.stop()
 
 class TicketNameModal(discord.ui.Modal):
     def __init__(self, ticket_channel):
@@ -214,16 +322,29 @@ class TicketNameModal(discord.ui.Modal):
         self.add_item(self.name)
 
     async def on_submit(self, interaction: discord.Interaction):
-        await self.ticket_channel.edit(name=self.name.value)
+        # Renames are limited per channel, the scheduler applies the latest name once allowed
+        rest_scheduler.submit(self.ticket_channel.id, "rename", partial(self.ticket_channel.edit, name=self.name.value))
         await interaction.response.send_message(embed=discord.Embed(
             title="✅ Ticket Renamed",
-            description=f"Ticket has been renamed to {self.name.value}",
+            description=f"Ticket will be renamed to {self.name.value}",
             color=discord.Color.green()
         ))
 
+# Ticket statuses in which a transaction ID was already accepted and can't be replaced
+PAYMENT_SUBMITTED_STATUSES = ('verifying', 'verified', 'completed')
+
+def payment_already_submitted(status: str) -> discord.Embed:
+    descriptions = {
+        'verifying': "Your transaction is already being verified. You will be notified here once it is done.",
+        'verified': "Your payment has been verified and is waiting for an administrator to approve it.",
+        'completed': "This payment has already been completed."
+    }
+    return discord.Embed(title="⏳ Payment Already Submitted", description=descriptions[status], color=discord.Color.orange())
+
 class TransactionModal(discord.ui.Modal):
-    def __init__(self, crypto_type: str, points_amount: int, price_eur: float):
+    def __init__(self, ticket_id: int, crypto_type: str, points_amount: int, price_eur: float):
         super().__init__(title="Transaction Verification")
+        self.ticket_id = ticket_id
         self.crypto_type = crypto_type
         self.points_amount = points_amount
         self.price_eur = price_eur
@@ -236,13 +357,12 @@ class TransactionModal(discord.ui.Modal):
         self.add_item(self.tx_id)
 
     async def on_submit(self, interaction: discord.Interaction):
-        from functions.database import is_transaction_id_used, save_trx_id, add_points
-        
-        # Get ticket ID from channel name
-        ticket_id = int(interaction.channel.name.split('-')[-1])
+        ticket_id = self.ticket_id
+        chain = CRYPTO_ADDRESSES[self.crypto_type]['network']
+        tx_id = self.tx_id.value.strip()
         
         # Check if transaction ID is already used
-        if is_transaction_id_used(self.tx_id.value):
+        if await db.is_transaction_id_used(tx_id, chain=chain):
             await interaction.response.send_message(
                 embed=discord.Embed(
                     title="❌ Transaction Already Used",
@@ -253,87 +373,154 @@ class TransactionModal(discord.ui.Modal):
             )
             return
         
-        # Verify transaction
-        is_valid = await BlockchainVerifier.verify_transaction(
-            self.crypto_type,
-            self.tx_id.value,
-            self.price_eur
-        )
-        
-        if is_valid:
-            # Add points to user
-            if add_points(id=interaction.user.id, points=self.points_amount):
-                # Save transaction ID to prevent reuse
-                if not save_trx_id(self.tx_id.value):
-                    await interaction.response.send_message(
-                        embed=discord.Embed(
-                            title="❌ Error",
-                            description="Failed to store transaction ID. Please contact an administrator.",
-                            color=discord.Color.red()
-                        )
-                    )
-                    return
-
-                # Send success message to user
-                await interaction.response.send_message(
-                    embed=discord.Embed(
-                        title="✅ Payment Verified",
-                        description=f"Your payment has been verified and {self.points_amount} points have been added to your account! The ticket will be closed shortly.",
-                        color=discord.Color.green()
-                    )
-                )
-                
-                import asyncio
-                await asyncio.sleep(10)  # Wait for 10 seconds before deleting the ticket
-                await interaction.channel.delete()
-            else:
-                await interaction.response.send_message(
-                    embed=discord.Embed(
-                        title="❌ Error",
-                        description="Failed to add points to your account. Please contact an administrator.",
-                        color=discord.Color.red()
-                    )
-                )
-        else:
-            await interaction.response.send_message(
+        # Hand the verification to the background pool and answer right away
+        await interaction.response.defer()
+        pool = interaction.client.get_cog("Ticket").verifications
+        if not await pool.submit(ticket_id, self.points_amount, self.price_eur, self.crypto_type, tx_id):
+            ticket = await db.get_ticket_verification(ticket_id)
+            if ticket and ticket[7] in PAYMENT_SUBMITTED_STATUSES:
+                # Finish was pressed again while the first transaction ID is still being handled
+                await interaction.followup.send(embed=payment_already_submitted(ticket[7]), ephemeral=True)
+                return
+            await interaction.followup.send(
                 embed=discord.Embed(
-                    title="❌ Invalid Transaction",
-                    description="The transaction ID you provided could not be verified. Please check and try again.",
+                    title="❌ Error",
+                    description="Failed to start verifying your payment. Please contact an administrator.",
                     color=discord.Color.red()
                 )
             )
+            return
 
-class PointPurchaseView(discord.ui.View):
-    def __init__(self, cog):
-        super().__init__(timeout=None)
-        self.cog = cog
+        await interaction.followup.send(
+            embed=discord.Embed(
+                title="⏳ Verifying Payment",
+                description=f"Your transaction is being verified. The result will be posted in this ticket, "
+                            f"unconfirmed transactions are checked again every {VERIFICATION_SETTINGS['retry_interval']} seconds.",
+                color=discord.Color.blue()
+            )
+        )
 
-    @discord.ui.button(label="Create Ticket", style=discord.ButtonStyle.primary, emoji="🎫")
-    async def create_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.cog.create_purchase_ticket(interaction)
+async def payment_verification_failed(channel: discord.TextChannel):
+    await channel.send(
+        embed=discord.Embed(
+            title="❌ Invalid Transaction",
+            description="The transaction ID you provided could not be verified. Please check and try again.",
+            color=discord.Color.red()
+        )
+    )
 
-async def display_points_shop(interaction: discord.Interaction, cog):
-    embed = discord.Embed(
-        title="🏪 Points Shop",
-        description="Welcome to the Points Shop! Click the button below to create a purchase ticket.",
-        color=discord.Color.blue()
+async def complete_verified_payment(channel: discord.TextChannel, ticket: tuple, approved_by: int = None) -> bool:
+    """Credit a verified ticket (row from get_ticket_verification) and close its channel."""
+    ticket_id, _, user_id, points_amount, _, crypto_type, transaction_id = ticket[:7]
+    guild_id = ticket[11]
+    chain = CRYPTO_ADDRESSES[crypto_type]['network']
+
+    # Mark the transaction as used and add points in one database transaction
+    try:
+        claimed = await db.claim_transaction(chain, transaction_id, guild_id, user_id, points_amount, ticket_id, approved_by)
+    except Exception:
+        await channel.send(
+            embed=discord.Embed(
+                title="❌ Error",
+                description="Failed to add points to your account. Please contact an administrator.",
+                color=discord.Color.red()
+            )
+        )
+        return False
+
+    if not claimed:
+        # The ticket's own claim committed first (e.g. two admins approving at once), it is already paid
+        current = await db.get_ticket_verification(ticket_id)
+        if current and current[7] == 'completed':
+            return False
+
+        await db.set_ticket_status(ticket_id, 'failed')
+        await channel.send(
+            embed=discord.Embed(
+                title="❌ Transaction Already Used",
+                description="This transaction ID has already been used for another ticket.",
+                color=discord.Color.red()
+            )
+        )
+        return False
+
+    await channel.send(
+        embed=discord.Embed(
+            title="✅ Payment Verified",
+            description=f"<@{user_id}>, your payment has been verified and {points_amount} points have been added to your account! The ticket will be closed shortly.",
+            color=discord.Color.green()
+        )
     )
-    
-    # Add points packages
-    from config import POINTS_PRICES
-    for points, price in POINTS_PRICES.items():
-        embed.add_field(
-            name=f"{points} Points",
-            value=f"Price: {price}$",
-            inline=True
+
+    rest_scheduler.submit(channel.id, "delete", channel.delete, delay=10)  # Wait for 10 seconds before deleting the ticket
+    return True
+
+class PaymentApproveButton(discord.ui.DynamicItem[discord.ui.Button], template=r"ticket:approve:(?P<ticket_id>[0-9]+)"):
+    def __init__(self, ticket_id: int):
+        self.ticket_id = ticket_id
+        super().__init__(discord.ui.Button(
+            label="Approve Payment",
+            style=discord.ButtonStyle.success,
+            emoji="✅",
+            custom_id=f"ticket:approve:{ticket_id}"
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["ticket_id"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        if not await db.user_admin(interaction.guild_id, interaction.user.id):
+            await user_forbidden(interaction, ephemeral=True)
+            return
+
+        ticket = await db.get_ticket_verification(self.ticket_id)
+        if not ticket or ticket[7] != 'verified':
+            await slot_purchase_failed(interaction, "This payment is not waiting for approval.", ephemeral=True)
+            return
+
+        await interaction.response.send_message(
+            embed=discord.Embed(
+                title="✅ Payment Approved",
+                description=f"Approved by {interaction.user.mention}.",
+                color=discord.Color.green()
+            )
         )
-    
-    embed.set_footer(text="Click the button below to start your purchase")
-    await interaction.response.send_message(embed=embed, view=PointPurchaseView(cog))
+        await complete_verified_payment(interaction.channel, ticket, interaction.user.id)
+
+async def payment_awaiting_approval(channel: discord.TextChannel, ticket_id: int):
+    await channel.send(
+        embed=discord.Embed(
+            title="🔎 Payment Verified",
+            description="The transaction has been verified on-chain and is waiting for an administrator to approve it.",
+            color=discord.Color.blue()
+        ),
+        view=RoutedView(PaymentApproveButton(ticket_id))
+    )
+
+class PointPurchaseButton(discord.ui.DynamicItem[discord.ui.Button], template=r"points:create-ticket"):
+    def __init__(self):
+        super().__init__(discord.ui.Button(
+            label="Create Ticket",
+            style=discord.ButtonStyle.primary,
+            emoji="🎫",
+            custom_id="points:create-ticket"
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls()
+
+    async def callback(self, interaction: discord.Interaction):
+        await interaction.client.get_cog("Point").create_purchase_ticket(interaction)
 
-class CryptoSelect(discord.ui.Select):
-    def __init__(self, addresses: dict):
-        self.row = 0
+async def display_points_shop(interaction: discord.Interaction):
+    settings = await guild_settings.get(interaction.guild_id)
+    await interaction.response.send_message(embed=render_cache.shop_embed(settings.points_prices), view=RoutedView(PointPurchaseButton()))
+
+class CryptoSelect(discord.ui.DynamicItem[discord.ui.Select], template=r"ticket:crypto:(?P<ticket_id>[0-9]+)"):
+    def __init__(self, ticket_id: int, addresses: dict = CRYPTO_ADDRESSES):
+        self.ticket_id = ticket_id
         options = [
             discord.SelectOption(
                 label=crypto_type,
@@ -341,37 +528,45 @@ class CryptoSelect(discord.ui.Select):
                 value=crypto_type
             ) for crypto_type in addresses.keys()
         ]
-        super().__init__(
+        super().__init__(discord.ui.Select(
             placeholder="Select payment method...",
-            options=options
-        )
+            options=options,
+            row=1,
+            custom_id=f"ticket:crypto:{ticket_id}"
+        ))
 
-    async def callback(self, interaction: discord.Interaction):
-        self.view.selected_crypto = self.values[0]  # Store the selected crypto
-        await display_crypto_address(interaction, self.values[0])
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls(int(match["ticket_id"]))
 
-class PointsPackageSelect(discord.ui.Select):
-    def __init__(self):
-        self.row = 0
-        from config import POINTS_PRICES
-        options = [
-            discord.SelectOption(
-                label=f"{points} Points",
-                description=f"{price}$",
-                value=str(points)
-            ) for points, price in POINTS_PRICES.items()
-        ]
-        super().__init__(
+    async def callback(self, interaction: discord.Interaction):
+        crypto_type = self.item.values[0]
+        await db.set_ticket_crypto(self.ticket_id, crypto_type)  # Store the selected crypto
+        await display_crypto_address(interaction, crypto_type)
+
+class PointsPackageSelect(discord.ui.DynamicItem[discord.ui.Select], template=r"ticket:package:(?P<ticket_id>[0-9]+)"):
+    def __init__(self, ticket_id: int, prices: dict = POINTS_PRICES):
+        self.ticket_id = ticket_id
+        super().__init__(discord.ui.Select(
             placeholder="Select points package...",
-            options=options
-        )
+            options=list(render_cache.package_options(prices)),
+            row=0,
+            custom_id=f"ticket:package:{ticket_id}"
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls(int(match["ticket_id"]))
 
     async def callback(self, interaction: discord.Interaction):
-        from config import POINTS_PRICES
-        points = int(self.values[0])
-        price = POINTS_PRICES[points]
-        self.view.selected_points = points
-        self.view.selected_price = price
+        points = int(self.item.values[0])
+        settings = await guild_settings.get(interaction.guild_id)
+        price = settings.points_prices.get(points)
+        if price is None:
+            # Package removed after the ticket was opened
+            await slot_purchase_failed(interaction, "This points package is no longer available.", ephemeral=True)
+            return
+        await db.set_ticket_package(self.ticket_id, points, price)
         await interaction.response.send_message(
             embed=discord.Embed(
                 title="✅ Points Package Selected",
@@ -381,30 +576,69 @@ class PointsPackageSelect(discord.ui.Select):
             ephemeral=True
         )
 
-class TicketView(discord.ui.View):
-    def __init__(self, addresses: dict):
-        super().__init__(timeout=None)
-        self.add_item(PointsPackageSelect())
-        self.add_item(CryptoSelect(addresses))
-        self.selected_crypto = None
-        self.selected_points = None
-        self.selected_price = None
-
-    @discord.ui.button(label="Rename Ticket", style=discord.ButtonStyle.secondary, emoji="✏️", row=2)
-    async def rename_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
+class TicketRenameButton(discord.ui.DynamicItem[discord.ui.Button], template=r"ticket:rename:(?P<ticket_id>[0-9]+)"):
+    def __init__(self, ticket_id: int):
+        self.ticket_id = ticket_id
+        super().__init__(discord.ui.Button(
+            label="Rename Ticket",
+            style=discord.ButtonStyle.secondary,
+            emoji="✏️",
+            row=2,
+            custom_id=f"ticket:rename:{ticket_id}"
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["ticket_id"]))
+
+    async def callback(self, interaction: discord.Interaction):
         modal = TicketNameModal(interaction.channel)
         await interaction.response.send_modal(modal)
 
-    @discord.ui.button(label="Close Ticket", style=discord.ButtonStyle.danger, emoji="🔒", row=2)
-    async def close_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not user_admin(interaction.user.id):
+class TicketCloseButton(discord.ui.DynamicItem[discord.ui.Button], template=r"ticket:close:(?P<ticket_id>[0-9]+)"):
+    def __init__(self, ticket_id: int):
+        self.ticket_id = ticket_id
+        super().__init__(discord.ui.Button(
+            label="Close Ticket",
+            style=discord.ButtonStyle.danger,
+            emoji="🔒",
+            row=2,
+            custom_id=f"ticket:close:{ticket_id}"
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["ticket_id"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        if not await db.user_admin(interaction.guild_id, interaction.user.id):
             await user_forbidden(interaction)
             return
         await interaction.channel.delete()
 
-    @discord.ui.button(label="Finish", style=discord.ButtonStyle.success, emoji="✅", row=2)
-    async def finish_payment(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not self.selected_crypto:
+class TicketFinishButton(discord.ui.DynamicItem[discord.ui.Button], template=r"ticket:finish:(?P<ticket_id>[0-9]+)"):
+    def __init__(self, ticket_id: int):
+        self.ticket_id = ticket_id
+        super().__init__(discord.ui.Button(
+            label="Finish",
+            style=discord.ButtonStyle.success,
+            emoji="✅",
+            row=2,
+            custom_id=f"ticket:finish:{ticket_id}"
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["ticket_id"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        ticket = await db.get_ticket_verification(self.ticket_id)
+        if ticket and ticket[7] in PAYMENT_SUBMITTED_STATUSES:
+            await interaction.response.send_message(embed=payment_already_submitted(ticket[7]), ephemeral=True)
+            return
+
+        points_amount, price_eur, crypto_type = (ticket[3], ticket[4], ticket[5]) if ticket else (None, None, None)
+        if not crypto_type:
             await interaction.response.send_message(
                 embed=discord.Embed(
                     title="❌ Error",
@@ -415,7 +649,7 @@ class TicketView(discord.ui.View):
             )
             return
             
-        if not self.selected_points or not self.selected_price:
+        if not points_amount or not price_eur:
             await interaction.response.send_message(
                 embed=discord.Embed(
                     title="❌ Error",
@@ -426,12 +660,24 @@ class TicketView(discord.ui.View):
             )
             return
             
-        modal = TransactionModal(self.selected_crypto, self.selected_points, self.selected_price)
+        modal = TransactionModal(self.ticket_id, crypto_type, points_amount, price_eur)
         await interaction.response.send_modal(modal)
 
+class TicketView(RoutedView):
+    def __init__(self, ticket_id: int, addresses: dict, prices: dict = POINTS_PRICES):
+        super().__init__(
+            PointsPackageSelect(ticket_id, prices),
+            CryptoSelect(ticket_id, addresses),
+            TicketRenameButton(ticket_id),
+            TicketCloseButton(ticket_id),
+            TicketFinishButton(ticket_id)
+        )
+
+# Ticket components routed by custom_id, registered by the Ticket cog
+TICKET_COMPONENTS = (PointsPackageSelect, CryptoSelect, TicketRenameButton, TicketCloseButton, TicketFinishButton, PaymentApproveButton)
+
 async def display_crypto_address(interaction: discord.Interaction, crypto_type: str):
-    from functions.database import get_crypto_addresses
-    addresses = get_crypto_addresses()
+    addresses = await db.get_crypto_addresses()
     
     if crypto_type not in addresses:
         await interaction.response.send_message(
@@ -472,43 +718,65 @@ class SlotInfoSelect(discord.ui.Select):
         )
 
     async def callback(self, interaction: discord.Interaction):
-        from functions.database import get_slot_info
         slot_id = int(self.values[0])
-        slot_info = get_slot_info(slot_id)
+        slot_info = await slot_registry.get(slot_id)
         
         if not slot_info:
             await slot_purchase_failed(interaction, "Failed to get slot information!")
             return
             
-        points_per_duration = slot_info[0]
-        from config import DURATION_CONFIG
-        durations = []
-        for duration_key, duration_data in DURATION_CONFIG.items():
-            seconds = duration_data["seconds"]
-            name = duration_data["name"]
-            # Calculate points based on the slot's points_per_duration
-            points = int(points_per_duration * (seconds / 3600))
-            durations.append((name, points))
-        
-        await display_slot_durations(interaction, slot_id, durations)
+        await display_slot_durations(interaction, slot_id, slot_info[0])
 
 class SlotInfoView(discord.ui.View):
     def __init__(self, slots: list):
         super().__init__()
         self.add_item(SlotInfoSelect(slots))
 
-async def delete_all_messages(channel: discord.TextChannel):
+async def delete_all_messages(channel: discord.TextChannel, layout: tuple = ()):
+    """
+    Empty a channel. Messages younger than 14 days are bulk deleted in batches
+    of 100, only older ones (which Discord won't bulk delete) go one by one.
+    `layout` are the IDs of the messages the bot last rendered in the channel
+    (slot_registry.messages). When the newest message is one of them, the
+    channel holds nothing else and they are deleted without reading history.
+    """
+    if channel.last_message_id is None:
+        return  # Nothing was ever posted here
+
+    # Keep a minute of margin so a message doesn't age out between fetch and delete
+    cutoff = discord.utils.utcnow() - datetime.timedelta(days=14) + datetime.timedelta(minutes=1)
+    layout = [message_id for message_id in layout if message_id]
+    if channel.last_message_id in layout:
+        messages = [channel.get_partial_message(message_id) for message_id in layout]
+        try:
+            if all(discord.utils.snowflake_time(message.id) > cutoff for message in messages):
+                await channel.delete_messages(messages)
+            else:
+                for message in messages:
+                    await message.delete()
+            return
+        except discord.NotFound:
+            pass  # Someone deleted part of the layout, fall back to reading the channel
+
+    batch = []
+    old_messages = []
     async for msg in channel.history(limit=None):
+        if msg.created_at > cutoff:
+            batch.append(msg)
+            if len(batch) == 100:
+                await channel.delete_messages(batch)
+                batch = []
+        else:
+            old_messages.append(msg)
+
+    if batch:
+        await channel.delete_messages(batch)
+    for msg in old_messages:
         await msg.delete()
 
-async def display_slot_available(channel: discord.TextChannel, slot_id: int, durations: list, view: discord.ui.View):
-    await delete_all_messages(channel)
-    embed = discord.Embed(
-        title=f"Slot {slot_id} - Available",
-        description="This Slot is currently available, you can buy it by using the Select Menu below.",
-        color=discord.Color.blue()
-    )
-    await channel.send(embed=embed, view=view)  # Attach the persistent view
+async def display_slot_available(channel: discord.TextChannel, slot_id: int, view: discord.ui.View, layout: tuple = ()):
+    await delete_all_messages(channel, layout)
+    return await channel.send(embed=render_cache.available_embed(slot_id), view=view)  # Attach the persistent view
 
 async def display_slot_claimed(channel: discord.TextChannel, slot_id: int, username: str, pings_left: int, available_until: str, owner_id: int, view: discord.ui.View):
     await delete_all_messages(channel)
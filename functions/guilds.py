@@ -0,0 +1,103 @@
+import asyncio
+import json
+from typing import NamedTuple
+
+from config import TICKET_CATEGORY_ID, TICKET_ADMIN_ROLES, POINTS_PRICES, SUPREME_USER
+from functions.database import db
+from functions.render import render_cache
+
+
+class GuildSettings(NamedTuple):
+    ticket_category_id: int
+    ticket_admin_roles: tuple
+    points_prices: dict         # {points: price}, shared between lookups, never modify it
+    supreme_user: int
+
+    def is_supreme(self, user_id: int) -> bool:
+        # The deployment's SUPREME_USER stays supreme in every guild
+        return user_id in (self.supreme_user, SUPREME_USER)
+
+
+DEFAULT_SETTINGS = GuildSettings(TICKET_CATEGORY_ID, tuple(TICKET_ADMIN_ROLES), dict(POINTS_PRICES), SUPREME_USER)
+
+
+def _decode(row: tuple) -> dict:
+    """Overrides stored in guild_settings, only the columns that are set."""
+    if not row:
+        return {}
+    ticket_category_id, ticket_admin_roles, points_prices, supreme_user = row
+    overrides = {}
+    if ticket_category_id is not None:
+        overrides["ticket_category_id"] = ticket_category_id
+    if ticket_admin_roles is not None:
+        overrides["ticket_admin_roles"] = tuple(json.loads(ticket_admin_roles))
+    if points_prices is not None:
+        # Stored as [[points, price], ...], JSON object keys would turn the points into strings
+        overrides["points_prices"] = {points: price for points, price in json.loads(points_prices)}
+    if supreme_user is not None:
+        overrides["supreme_user"] = supreme_user
+    return overrides
+
+
+class GuildSettingsCache:
+    """
+    Per-guild ticket and shop settings, falling back to config.py for anything
+    a guild did not override. Lookups are served from memory after the first
+    one, concurrent first lookups of a guild share one query, and update()
+    writes through to guild_settings before changing the cached copy.
+    """
+
+    def __init__(self):
+        self._settings = {}
+        self._loading = {}
+
+    async def get(self, guild_id: int) -> GuildSettings:
+        settings = self._settings.get(guild_id)
+        if settings is not None:
+            return settings
+
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = asyncio.ensure_future(db.get_guild_settings(guild_id))
+            self._loading[guild_id] = task
+        try:
+            row = await task
+        finally:
+            if self._loading.get(guild_id) is task:
+                del self._loading[guild_id]
+        if guild_id not in self._settings:
+            self._settings[guild_id] = DEFAULT_SETTINGS._replace(**_decode(row))
+        return self._settings[guild_id]
+
+    async def update(self, guild_id: int, **changes) -> GuildSettings:
+        """Override settings of a guild, a value of None goes back to the config default."""
+        overrides = _decode(await db.get_guild_settings(guild_id))
+        old_prices = overrides.get("points_prices", DEFAULT_SETTINGS.points_prices)
+        overrides.update(changes)
+        overrides = {name: value for name, value in overrides.items() if value is not None}
+
+        roles = overrides.get("ticket_admin_roles")
+        prices = overrides.get("points_prices")
+        saved = await db.set_guild_settings(
+            guild_id,
+            ticket_category_id=overrides.get("ticket_category_id"),
+            ticket_admin_roles=json.dumps(list(roles)) if roles is not None else None,
+            points_prices=json.dumps(sorted(prices.items())) if prices is not None else None,
+            supreme_user=overrides.get("supreme_user")
+        )
+        if not saved:
+            return None
+        if prices is not None:
+            overrides["points_prices"] = dict(sorted(prices.items()))
+        settings = self._settings[guild_id] = DEFAULT_SETTINGS._replace(**overrides)
+        if settings.points_prices != old_prices and old_prices != DEFAULT_SETTINGS.points_prices:
+            # Embeds for the old price table are dead weight unless another guild still sells it
+            if all(other.points_prices != old_prices for other in self._settings.values()):
+                render_cache.forget_prices(old_prices)
+        return settings
+
+    def forget(self, guild_id: int):
+        self._settings.pop(guild_id, None)
+
+
+guild_settings = GuildSettingsCache()
@@ -0,0 +1,246 @@
+import bisect
+import contextvars
+import threading
+import time
+
+from aiohttp import web
+
+from config import METRICS_SETTINGS
+
+# Latency buckets (in seconds): interactions and explorer calls, then database calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items(), key=lambda item: tuple(map(str, item[0])))
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items: list) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A gauge whose samples are computed by `collect()` on every scrape."""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), collect=None):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def render(self) -> list:
+        if self.collect:
+            samples = {tuple(labels): value for labels, value in self.collect()}
+            with self._lock:
+                self._values = samples
+        return super().render()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def _render_samples(self, items: list) -> list:
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = (), collect=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, collect))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                print(f"Error collecting metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+command_seconds = registry.histogram(
+    "slotbot_command_duration_seconds", "Time spent handling an app command.", ("cog", "command", "outcome")
+)
+command_db_seconds = registry.histogram(
+    "slotbot_command_db_seconds", "Database time spent by one app command.", ("cog", "command"), DB_BUCKETS
+)
+db_call_seconds = registry.histogram(
+    "slotbot_db_call_duration_seconds", "Time a database function ran on the database thread.", ("function",), DB_BUCKETS
+)
+db_calls = registry.counter(
+    "slotbot_db_calls_total", "Database function calls by outcome.", ("function", "outcome")
+)
+explorer_request_seconds = registry.histogram(
+    "slotbot_explorer_request_duration_seconds", "Blockchain explorer and price provider requests.", ("provider", "status")
+)
+verifications = registry.counter(
+    "slotbot_verifications_total", "Payment verifications by network and outcome.", ("network", "outcome")
+)
+loop_lag_seconds = registry.histogram(
+    "slotbot_loop_lag_seconds", "How late the event loop watchdog heartbeat woke up."
+)
+loop_stalls = registry.counter(
+    "slotbot_loop_stalls_total", "Times the event loop was blocked past the watchdog threshold."
+)
+
+# Set while an app command runs, so database time can be charged to it
+current_command = contextvars.ContextVar("current_command", default=None)
+
+
+def begin_command(interaction):
+    """Start timing an app command, call from the cog's interaction_check."""
+    state = {"started": time.perf_counter(), "db": 0.0}
+    interaction.extras["metrics"] = state
+    current_command.set(state)
+
+
+def end_command(interaction, outcome: str):
+    state = interaction.extras.pop("metrics", None)
+    command = interaction.command
+    if state is None or command is None:
+        return
+    # Tasks spawned by the command inherit the context var, stop charging them
+    state["finished"] = True
+    cog = command.binding.qualified_name if getattr(command, "binding", None) else ""
+    command_seconds.observe(time.perf_counter() - state["started"], cog=cog, command=command.qualified_name, outcome=outcome)
+    command_db_seconds.observe(state["db"], cog=cog, command=command.qualified_name)
+
+
+def charge_db_time(seconds: float):
+    state = current_command.get()
+    if state is not None and "finished" not in state:
+        state["db"] += seconds
+
+
+def register_collectors():
+    """Gauges read from the running bot on every scrape."""
+    from functions.database import error_counts
+    from functions.slots import slot_registry
+    from functions.blockchain import BlockchainVerifier
+    from functions.outbound import rest_scheduler
+
+    def slots():
+        occupied, total = slot_registry.occupancy()
+        return [(("occupied",), occupied), (("available",), total - occupied)]
+
+    def db_errors():
+        return [((operation, kind), count) for (operation, kind), count in list(error_counts.items())]
+
+    def transaction_cache():
+        return [((key,), value) for key, value in BlockchainVerifier.transaction_cache.stats().items()]
+
+    registry.gauge("slotbot_slots", "Slots by state.", ("state",), slots)
+    registry.gauge("slotbot_db_errors", "Errors swallowed by the database layer since start.", ("operation", "kind"), db_errors)
+    registry.gauge("slotbot_transaction_cache", "Explorer answer cache statistics.", ("stat",), transaction_cache)
+    registry.gauge("slotbot_outbound_pending", "Discord calls waiting in the outbound scheduler.", (), lambda: [((), rest_scheduler.pending())])
+
+
+class MetricsServer:
+    """Serves the registry in the Prometheus text format on METRICS_SETTINGS host/port."""
+
+    def __init__(self, host: str = METRICS_SETTINGS['host'], port: int = METRICS_SETTINGS['port']):
+        self.host = host
+        self.port = port
+        self._runner = None
+        self._collecting = False
+
+    async def start(self):
+        if self._runner is not None:
+            return
+        if not self._collecting:
+            register_collectors()
+            self._collecting = True
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8", headers={"X-Content-Type-Options": "nosniff"})
+
+
+metrics_server = MetricsServer()
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+from config import REST_SETTINGS
+
+
+class ActionScheduler:
+    """
+    Runs outbound Discord calls (renames, edits, re-renders) off the caller's path.
+    Actions are queued per channel and keyed by (kind, target). Submitting a key
+    that is still queued replaces its action, so only the latest state is sent.
+    Kinds listed in `buckets` as (limit, window) are held back once the channel
+    used up its window, while the other actions of that channel go ahead.
+    Channels are drained in parallel, up to `concurrency` calls at a time.
+    """
+
+    def __init__(self, buckets: dict = None, concurrency: int = REST_SETTINGS['concurrency']):
+        self.buckets = buckets if buckets is not None else {
+            "rename": (REST_SETTINGS['rename_limit'], REST_SETTINGS['rename_window'])
+        }
+        self.concurrency = concurrency
+        self._semaphore = None
+        self._queues = {}
+        self._wakeups = {}
+        self._workers = {}
+        self._sent = {}
+
+    def submit(self, channel_id: int, kind: str, action, target=None, delay: float = 0) -> asyncio.Future:
+        """
+        Queue `action`, a coroutine function taking no arguments.
+        The returned future resolves to its result, or None if the call failed.
+        Awaiting it is optional.
+        """
+        loop = asyncio.get_running_loop()
+        queue = self._queues.setdefault(channel_id, OrderedDict())
+        key = (kind, target)
+        not_before = time.monotonic() + delay
+        if key in queue:
+            future = queue[key][1]
+        else:
+            future = loop.create_future()
+        queue[key] = [action, future, not_before]
+
+        if channel_id in self._wakeups:
+            self._wakeups[channel_id].set()
+        if channel_id not in self._workers:
+            self._wakeups[channel_id] = asyncio.Event()
+            self._workers[channel_id] = asyncio.create_task(self._drain(channel_id))
+        return future
+
+    def pending(self, channel_id: int = None) -> int:
+        if channel_id is not None:
+            return len(self._queues.get(channel_id, ()))
+        return sum(len(queue) for queue in self._queues.values())
+
+    def stop(self):
+        for task in self._workers.values():
+            task.cancel()
+        for queue in self._queues.values():
+            for _, future, _ in queue.values():
+                future.cancel()
+        self._workers.clear()
+        self._wakeups.clear()
+        self._queues.clear()
+
+    def _ready_at(self, channel_id: int, kind: str, now: float) -> float:
+        if kind not in self.buckets:
+            return 0
+        limit, window = self.buckets[kind]
+        sent = self._sent.get((kind, channel_id))
+        if not sent:
+            return 0
+        while sent and sent[0] <= now - window:
+            sent.popleft()
+        if len(sent) < limit:
+            return 0
+        return sent[0] + window
+
+    def _next(self, channel_id: int, queue: OrderedDict, now: float) -> tuple:
+        """Return the first key that may run now, otherwise the earliest time one can."""
+        earliest = None
+        for key, (_, _, not_before) in queue.items():
+            ready_at = max(not_before, self._ready_at(channel_id, key[0], now))
+            if ready_at <= now:
+                return key, now
+            if earliest is None or ready_at < earliest:
+                earliest = ready_at
+        return None, earliest
+
+    async def _drain(self, channel_id: int):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        queue = self._queues[channel_id]
+        wakeup = self._wakeups[channel_id]
+        try:
+            while queue:
+                wakeup.clear()
+                now = time.monotonic()
+                key, ready_at = self._next(channel_id, queue, now)
+                if key is None:
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), timeout=ready_at - now)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                action, future, _ = queue.pop(key)
+                if key[0] in self.buckets:
+                    self._sent.setdefault((key[0], channel_id), deque()).append(now)
+                async with self._semaphore:
+                    try:
+                        result = await action()
+                    except asyncio.CancelledError:
+                        future.cancel()
+                        raise
+                    except Exception as e:
+                        print(f"Error running {key[0]} for channel {channel_id}: {e}")
+                        result = None
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            # Nothing awaits between the empty check and here, so no submit can slip in
+            if self._workers.get(channel_id) is asyncio.current_task():
+                del self._workers[channel_id]
+                del self._wakeups[channel_id]
+                if not queue:
+                    del self._queues[channel_id]
+
+
+rest_scheduler = ActionScheduler()
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from config import PROFILER_SETTINGS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _short_path(filename: str) -> str:
+    """Repo files relative to the repo, library files from their package down."""
+    if filename.startswith(ROOT + os.sep):
+        return os.path.relpath(filename, ROOT)
+    _, marker, inside = filename.rpartition("site-packages" + os.sep)
+    if marker:
+        return inside
+    return os.path.join(os.path.basename(os.path.dirname(filename)), os.path.basename(filename))
+
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{frame.f_lineno})"
+
+
+def collapse_frame(frame) -> str:
+    """The stack under `frame` as one collapsed line, outermost call first."""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame).replace(";", ":"))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def collapse_task(task: asyncio.Task) -> str:
+    """The chain of coroutines `task` is awaiting, outermost first."""
+    names = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        names.append(frame_name(frame).replace(";", ":"))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return ";".join(names) or task.get_name()
+
+
+class Profile:
+    """Samples taken by LoopProfiler.run, as collapsed stacks (flamegraph.pl / speedscope input)."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.stacks = Counter()         # collapsed loop thread stack -> samples
+        self.tasks = Counter()          # collapsed task await chain -> samples
+        self.samples = 0
+        self.task_samples = 0
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def collapsed_tasks(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.tasks.most_common())
+
+    def hottest(self, limit: int = 5) -> list:
+        """[(frame, share of samples)] for the frames the loop thread was executing most."""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return [(frame, count / self.samples) for frame, count in leaves.most_common(limit)] if self.samples else []
+
+
+class LoopProfiler:
+    """
+    Statistical profiler for the running bot.
+    A helper thread samples the event loop thread's stack every `interval`
+    seconds, while a coroutine on the loop records what every asyncio task
+    is awaiting every `task_interval` seconds.
+    """
+
+    def __init__(self, interval: float = PROFILER_SETTINGS['interval'], task_interval: float = PROFILER_SETTINGS['task_interval']):
+        self.interval = interval
+        self.task_interval = task_interval
+        self.running = False
+
+    async def run(self, seconds: float) -> Profile:
+        if self.running:
+            raise RuntimeError("A profile is already running")
+        self.running = True
+        try:
+            profile = Profile(seconds)
+            deadline = time.perf_counter() + seconds
+            sampler = asyncio.ensure_future(asyncio.to_thread(self._sample_thread, threading.get_ident(), deadline, profile))
+            ignored = {asyncio.current_task(), sampler}
+            while not sampler.done():
+                for task in asyncio.all_tasks():
+                    if task not in ignored and not task.done():
+                        profile.tasks[collapse_task(task)] += 1
+                profile.task_samples += 1
+                await asyncio.wait({sampler}, timeout=self.task_interval)
+            await sampler
+            return profile
+        finally:
+            self.running = False
+
+    def _sample_thread(self, thread_id: int, deadline: float, profile: Profile):
+        while time.perf_counter() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                profile.stacks[collapse_frame(frame)] += 1
+                profile.samples += 1
+            del frame
+            time.sleep(self.interval)
+
+
+loop_profiler = LoopProfiler()
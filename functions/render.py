@@ -0,0 +1,119 @@
+import discord
+
+from config import DURATION_CONFIG, POINTS_PRICES
+
+
+class RenderCache:
+    """
+    Prebuilt embeds and select options that only depend on prices and config.
+    Entries are keyed by their section and their own key (a slot price, a
+    points price table or a slot ID). A new price builds new entries next to
+    the existing ones, forget_price() and forget_prices() drop the ones built
+    for a price that is no longer used.
+    Returned embeds, option tuples and cost maps are shared, never modify them.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def forget_price(self, points_per_duration: int):
+        """Drop the duration entries built for a slot price that is no longer used."""
+        def built_for(key):
+            return key == points_per_duration or (isinstance(key, tuple) and key[1] == points_per_duration)
+        self._entries = {
+            entry_key: value for entry_key, value in self._entries.items()
+            if not (entry_key[0] == "durations" and built_for(entry_key[2]))
+        }
+
+    def forget_prices(self, prices: dict):
+        """Drop the shop, ticket and package entries built for a points price table that is no longer used."""
+        key = tuple(prices.items())
+        self._entries = {
+            entry_key: value for entry_key, value in self._entries.items()
+            if not (entry_key[0] == "points" and entry_key[2] == key)
+        }
+
+    def _get(self, section: str, name: str, key, build):
+        entry_key = (section, name, key)
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            entry = self._entries[entry_key] = build()
+        return entry
+
+    def shop_embed(self, prices: dict = POINTS_PRICES) -> discord.Embed:
+        def build():
+            embed = discord.Embed(
+                title="🏪 Points Shop",
+                description="Welcome to the Points Shop! Click the button below to create a purchase ticket.",
+                color=discord.Color.blue()
+            )
+            for points, price in prices.items():
+                embed.add_field(name=f"{points} Points", value=f"Price: {price}$", inline=True)
+            embed.set_footer(text="Click the button below to start your purchase")
+            return embed
+        return self._get("points", "shop", tuple(prices.items()), build)
+
+    def ticket_embed(self, prices: dict = POINTS_PRICES) -> discord.Embed:
+        def build():
+            embed = discord.Embed(
+                title="🎫 Point Purchase Ticket",
+                description="Welcome to your point purchase ticket! Please follow these steps:\n\n"
+                           "1. Select your desired cryptocurrency from the dropdown menu\n"
+                           "2. Send the exact amount to the provided address\n"
+                           "3. Click 'Finish' and provide your transaction ID\n\n"
+                           "Available Points Packages:",
+                color=discord.Color.blue()
+            )
+            for points, price in prices.items():
+                embed.add_field(name=f"{points} Points", value=f"Price: {price}$", inline=True)
+            return embed
+        return self._get("points", "ticket", tuple(prices.items()), build)
+
+    def package_options(self, prices: dict = POINTS_PRICES) -> tuple:
+        def build():
+            return tuple(
+                discord.SelectOption(label=f"{points} Points", description=f"{price}$", value=str(points))
+                for points, price in prices.items()
+            )
+        return self._get("points", "packages", tuple(prices.items()), build)
+
+    def duration_costs(self, points_per_duration: int) -> dict:
+        """{duration_key: (name, points)} for a slot priced at `points_per_duration` an hour."""
+        def build():
+            return {
+                key: (duration["name"], int(points_per_duration * (duration["seconds"] / 3600)))
+                for key, duration in DURATION_CONFIG.items()
+            }
+        return self._get("durations", "costs", points_per_duration, build)
+
+    def duration_options(self, points_per_duration: int) -> tuple:
+        def build():
+            return tuple(
+                discord.SelectOption(label=name, description=f"Buy {name} for {points} Points", value=key)
+                for key, (name, points) in self.duration_costs(points_per_duration).items()
+            )
+        return self._get("durations", "options", points_per_duration, build)
+
+    def durations_embed(self, slot_id: int, points_per_duration: int) -> discord.Embed:
+        def build():
+            embed = discord.Embed(
+                title=f"⏱️ Available Durations for Slot <#{slot_id}>",
+                description="Select how long you want to rent this slot:",
+                color=discord.Color.blue()
+            )
+            for name, points in self.duration_costs(points_per_duration).values():
+                embed.add_field(name=name, value=f"Cost: {points} points", inline=True)
+            return embed
+        return self._get("durations", "embed", (slot_id, points_per_duration), build)
+
+    def available_embed(self, slot_id: int) -> discord.Embed:
+        def build():
+            return discord.Embed(
+                title=f"Slot {slot_id} - Available",
+                description="This Slot is currently available, you can buy it by using the Select Menu below.",
+                color=discord.Color.blue()
+            )
+        return self._get("slots", "available", slot_id, build)
+
+
+render_cache = RenderCache()
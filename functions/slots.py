@@ -0,0 +1,318 @@
+import asyncio
+import heapq
+import time
+
+from config import SLOT_CONFIG
+from functions.database import db, PurchaseResult
+
+
+class SlotRegistry:
+    """
+    In-memory copy of the slots table.
+    Reads are served from memory, writes go to SQLite first and update the
+    cached row once the write succeeded. Rows use the same tuple layout as
+    get_slot_info: (points, default_name, occupied, occupied_by, occupied_till, pings_left)
+    The IDs of the messages rendered in each slot channel are kept next to the
+    rows as (claimed_message_id, info_message_id, available_message_id), and
+    so is the guild each slot belongs to.
+    """
+
+    def __init__(self):
+        self._slots = {}
+        self._messages = {}
+        self._guilds = {}
+        self._loaded = False
+        self._load_all = None
+        self._loading = {}
+        self._listeners = []
+
+    def subscribe(self, callback):
+        """Call `callback(slot_id, info)` after every write that changes a cached slot."""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, slot_id: int):
+        info = self._slots.get(slot_id)
+        for callback in list(self._listeners):
+            callback(slot_id, info)
+
+    async def load(self, force: bool = False):
+        """Load every slot in a single query. Concurrent callers share the same load."""
+        if self._loaded and not force:
+            return
+        if self._load_all is None:
+            self._load_all = asyncio.ensure_future(db.get_all_slots())
+        task = self._load_all
+        try:
+            rows = await task
+        finally:
+            if self._load_all is task:
+                self._load_all = None
+        self._slots = {row[0]: tuple(row[1:7]) for row in rows}
+        self._messages = {row[0]: tuple(row[7:10]) for row in rows}
+        self._guilds = {row[0]: row[10] for row in rows}
+        self._loaded = True
+
+    async def get(self, slot_id: int) -> tuple:
+        if slot_id in self._slots:
+            return self._slots[slot_id]
+        if not self._loaded:
+            await self.load()
+            if slot_id in self._slots:
+                return self._slots[slot_id]
+
+        # Slot added behind our back, coalesce concurrent lookups into one query
+        task = self._loading.get(slot_id)
+        if task is None:
+            task = asyncio.ensure_future(db.get_slot_info(slot_id))
+            self._loading[slot_id] = task
+        try:
+            info = await task
+        finally:
+            if self._loading.get(slot_id) is task:
+                del self._loading[slot_id]
+        if info:
+            self._slots[slot_id] = tuple(info)
+        return info
+
+    def peek(self, slot_id: int) -> tuple:
+        """Return the cached row without touching the database."""
+        return self._slots.get(slot_id)
+
+    def guild_of(self, slot_id: int) -> int:
+        return self._guilds.get(slot_id)
+
+    def occupancy(self) -> tuple:
+        """(occupied, total) over the cached slots."""
+        occupied = sum(1 for info in self._slots.values() if info[2])
+        return occupied, len(self._slots)
+
+    async def ids(self, guild_id: int = None) -> list:
+        """IDs of the slots in `guild_id`, of every slot if not given."""
+        await self.load()
+        return [slot_id for slot_id in self._slots if guild_id is None or self._guilds.get(slot_id) == guild_id]
+
+    async def all(self, guild_id: int = None) -> list:
+        """Return [(slot_id, info), ...] for every slot (in `guild_id` if given)."""
+        await self.load()
+        return [
+            (slot_id, info) for slot_id, info in self._slots.items()
+            if guild_id is None or self._guilds.get(slot_id) == guild_id
+        ]
+
+    async def user_slot(self, guild_id: int, user_id: int) -> tuple:
+        """Same shape as get_user_slot: (slot_id, occupied_till) or None."""
+        await self.load()
+        for slot_id, info in self._slots.items():
+            if info[2] and info[3] == user_id and self._guilds.get(slot_id) == guild_id:
+                return (slot_id, info[4])
+        return None
+
+    async def messages(self, slot_id: int) -> tuple:
+        """(claimed_message_id, info_message_id, available_message_id), None for any not rendered."""
+        await self.load()
+        if slot_id not in self._messages:
+            self._messages[slot_id] = tuple(await db.get_slot_messages(slot_id) or (None, None, None))
+        return self._messages[slot_id]
+
+    async def set_messages(self, slot_id: int, claimed_message_id: int = None, info_message_id: int = None, available_message_id: int = None) -> bool:
+        if not await db.set_slot_messages(slot_id, claimed_message_id, info_message_id, available_message_id):
+            return False
+        self._messages[slot_id] = (claimed_message_id, info_message_id, available_message_id)
+        return True
+
+    async def add(self, guild_id: int, channel_id: int, price_points: int, default_name: str) -> tuple:
+        info = await db.add_slot(guild_id, channel_id, price_points, default_name)
+        if info:
+            self._slots[channel_id] = tuple(info)
+            self._messages[channel_id] = (None, None, None)
+            self._guilds[channel_id] = guild_id
+        return info
+
+    async def remove(self, slot_id: int) -> bool:
+        if await db.remove_slot(channel_id=slot_id):
+            self._slots.pop(slot_id, None)
+            self._messages.pop(slot_id, None)
+            self._guilds.pop(slot_id, None)
+            return True
+        return False
+
+    async def purchase(self, slot_id: int, user_id: int, duration_seconds: int, points_cost: int) -> PurchaseResult:
+        """Rent the slot through purchase_slot, the database decides who wins concurrent purchases."""
+        result = await db.purchase_slot(slot_id, user_id, duration_seconds, points_cost)
+        if not result.ok:
+            return result
+        if slot_id in self._slots:
+            self._update(slot_id, occupied=1, occupied_by=user_id, occupied_till=result.occupied_till, pings_left=SLOT_CONFIG['default_pings'])
+        else:
+            info = await db.get_slot_info(slot_id)
+            if info:
+                self._slots[slot_id] = tuple(info)
+                self._notify(slot_id)
+        return result
+
+    async def reset(self, slot_id: int) -> bool:
+        if not await db.reset_slot(slot_id):
+            return False
+        self._update(slot_id, occupied=0, occupied_by=0, occupied_till=0, pings_left=SLOT_CONFIG['default_pings'])
+        return True
+
+    async def expire(self, slot_ids: list, now: int) -> list:
+        """Release every slot in `slot_ids` whose rental ended by `now` with one UPDATE."""
+        if not await db.expire_slots(slot_ids, now):
+            return []
+        expired = []
+        for slot_id in slot_ids:
+            info = self._slots.get(slot_id)
+            if info and info[2] and info[4] <= now:
+                self._update(slot_id, occupied=0, occupied_by=0, occupied_till=0, pings_left=SLOT_CONFIG['default_pings'])
+                expired.append(slot_id)
+        return expired
+
+    async def set_price(self, slot_id: int, price_points: int) -> bool:
+        if not await db.set_slot_price(slot_id, price_points):
+            return False
+        self._update(slot_id, points=price_points)
+        return True
+
+    async def set_pings(self, slot_id: int, pings_left: int) -> bool:
+        if not await db.update_slot_pings(slot_id, pings_left):
+            return False
+        self._update(slot_id, pings_left=pings_left)
+        return True
+
+    def _update(self, slot_id: int, **fields):
+        info = self._slots.get(slot_id)
+        if info is None:
+            return
+        points, default_name, occupied, occupied_by, occupied_till, pings_left = info
+        self._slots[slot_id] = (
+            fields.get("points", points),
+            fields.get("default_name", default_name),
+            fields.get("occupied", occupied),
+            fields.get("occupied_by", occupied_by),
+            fields.get("occupied_till", occupied_till),
+            fields.get("pings_left", pings_left)
+        )
+        self._notify(slot_id)
+
+
+
+class ExpiryScheduler:
+    """
+    Releases slots when their rental ends.
+    Occupied slots sit in a min-heap keyed by occupied_till and the worker
+    sleeps until the earliest one is due. Purchases and extensions wake it up
+    through the registry, and every slot due at the same time is released
+    with a single UPDATE before `on_expired(slot_ids)` is awaited.
+    With `owns(slot_id)` the scheduler only handles the slots it returns True
+    for, so each shard can run its own scheduler over its own guilds' slots.
+    Slots the UPDATE failed to release go back on the heap and are retried
+    after `retry_delay` seconds.
+    """
+
+    def __init__(self, registry: SlotRegistry, on_expired, owns=None, retry_delay: float = 5):
+        self.registry = registry
+        self.on_expired = on_expired
+        self.owns = owns or (lambda slot_id: True)
+        self.retry_delay = retry_delay
+        self._retry_at = 0
+        self._heap = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def start(self):
+        await self.registry.load()
+
+        # Catch up on rentals that ended while the bot was offline
+        now = int(time.time())
+        overdue = [row[0] for row in await db.get_expired_slots(now) if self.owns(row[0])]
+        if overdue:
+            expired = await self.registry.expire(overdue, now)
+            if expired:
+                await self.on_expired(expired)
+
+        # Rows come back sorted by occupied_till, which is already a valid heap
+        self._heap = [(row[5], row[0]) for row in await db.get_occupied_slots() if self.owns(row[0])]
+        self.registry.subscribe(self._on_slot_changed)
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self.registry.unsubscribe(self._on_slot_changed)
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def next_due(self) -> int:
+        """occupied_till of the next rental this scheduler will release, or None."""
+        pending = [
+            occupied_till for occupied_till, slot_id in self._heap
+            if (info := self.registry.peek(slot_id)) and info[2] and info[4] == occupied_till
+        ]
+        return min(pending) if pending else None
+
+    def schedule(self, slot_id: int, occupied_till: int):
+        heapq.heappush(self._heap, (occupied_till, slot_id))
+        if self._heap[0] == (occupied_till, slot_id):
+            self._wakeup.set()
+
+    def _on_slot_changed(self, slot_id: int, info: tuple):
+        # Stale heap entries are skipped when popped, so only new deadlines need pushing
+        if info and info[2] and info[4] and self.owns(slot_id):
+            self.schedule(slot_id, info[4])
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = max(self._heap[0][0], self._retry_at) - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = int(time.time())
+            due = {}
+            while self._heap and self._heap[0][0] <= now:
+                occupied_till, slot_id = heapq.heappop(self._heap)
+                info = self.registry.peek(slot_id)
+                if info and info[2] and info[4] == occupied_till:
+                    due[slot_id] = occupied_till
+            if not due:
+                continue
+
+            expired = []
+            try:
+                expired = await self.registry.expire(list(due), now)
+                if expired:
+                    await self.on_expired(expired)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error expiring slots {list(due)}: {e}")
+
+            # Slots still occupied past their deadline were not released, try them again later
+            retry = [
+                (occupied_till, slot_id) for slot_id, occupied_till in due.items()
+                if slot_id not in expired and (info := self.registry.peek(slot_id)) and info[2] and info[4] == occupied_till
+            ]
+            if retry:
+                print(f"Retrying expiry of slots {[slot_id for _, slot_id in retry]} in {self.retry_delay}s")
+                self._retry_at = time.time() + self.retry_delay
+                for entry in retry:
+                    heapq.heappush(self._heap, entry)
+
+
+slot_registry = SlotRegistry()
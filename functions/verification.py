@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+from config import VERIFICATION_SETTINGS
+from functions.database import db
+from functions.blockchain import BlockchainVerifier
+
+
+class VerificationPool:
+    """
+    Verifies payment tickets in the background.
+    Tickets waiting for verification are stored in the tickets table with
+    status 'verifying', so the queue is rebuilt from the database on start.
+    Unconfirmed transactions are retried every `retry_interval` seconds until
+    they verify, `max_retries` is reached or `max_wait_time` has passed.
+    `on_result(ticket, verified)` is awaited once per ticket with the row from
+    get_ticket_verification. A ticket is queued or checked at most once at a time.
+    """
+
+    def __init__(self, on_result, workers: int = VERIFICATION_SETTINGS['workers']):
+        self.on_result = on_result
+        self.workers = workers
+        self._queue = asyncio.Queue()
+        self._tasks = []
+        self._timers = {}
+        self._queued = set()        # ticket IDs waiting in the queue or being checked
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        now = time.time()
+        for ticket_id, next_check_at in await db.get_verifying_tickets():
+            self._schedule(ticket_id, (next_check_at or 0) - now)
+
+    def stop(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def submit(self, ticket_id: int, points_amount: int, price_eur: float, crypto_type: str, transaction_id: str) -> bool:
+        """Persist the pending verification and queue its first check."""
+        if not await db.start_ticket_verification(ticket_id, points_amount, price_eur, crypto_type, transaction_id):
+            return False
+        self._schedule(ticket_id, 0)
+        return True
+
+    def _schedule(self, ticket_id: int, delay: float):
+        timer = self._timers.pop(ticket_id, None)
+        if timer:
+            timer.cancel()
+        if delay <= 0:
+            self._enqueue(ticket_id)
+        else:
+            loop = asyncio.get_running_loop()
+            self._timers[ticket_id] = loop.call_later(delay, self._fire, ticket_id)
+
+    def _fire(self, ticket_id: int):
+        self._timers.pop(ticket_id, None)
+        self._enqueue(ticket_id)
+
+    def _enqueue(self, ticket_id: int):
+        if ticket_id in self._queued:
+            return
+        self._queued.add(ticket_id)
+        self._queue.put_nowait(ticket_id)
+
+    async def _worker(self):
+        while True:
+            ticket_id = await self._queue.get()
+            try:
+                await self._check(ticket_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error verifying ticket {ticket_id}: {e}")
+            finally:
+                self._queued.discard(ticket_id)
+                self._queue.task_done()
+
+    async def _check(self, ticket_id: int):
+        ticket = await db.get_ticket_verification(ticket_id)
+        if not ticket:
+            return
+        price_eur, crypto_type, transaction_id, status, attempts, started_at = ticket[4:10]
+        if status != 'verifying':
+            return
+
+        verified = await BlockchainVerifier.verify_transaction(crypto_type, transaction_id, price_eur)
+        attempts = (attempts or 0) + 1
+        now = int(time.time())
+
+        if verified:
+            await db.record_verification_attempt(ticket_id, attempts, now)
+            await self.on_result(ticket, True)
+            return
+
+        out_of_retries = attempts >= VERIFICATION_SETTINGS['max_retries']
+        out_of_time = now - (started_at or now) + VERIFICATION_SETTINGS['retry_interval'] > VERIFICATION_SETTINGS['max_wait_time']
+        if out_of_retries or out_of_time:
+            await db.record_verification_attempt(ticket_id, attempts, now)
+            await db.set_ticket_status(ticket_id, 'failed')
+            await self.on_result(ticket, False)
+            return
+
+        next_check_at = now + VERIFICATION_SETTINGS['retry_interval']
+        await db.record_verification_attempt(ticket_id, attempts, next_check_at)
+        self._schedule(ticket_id, VERIFICATION_SETTINGS['retry_interval'])
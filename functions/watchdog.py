@@ -0,0 +1,92 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+from config import WATCHDOG_SETTINGS
+from functions.metrics import loop_lag_seconds, loop_stalls
+from functions.profiler import collapse_frame
+
+
+class Stall(NamedTuple):
+    started_at: float           # Wall clock time the loop stopped answering
+    duration: float             # How long the loop stayed blocked (in seconds)
+    stack: tuple                # Frames of the blocking code, outermost first
+
+
+class LoopWatchdog:
+    """
+    Measures event loop lag and catches the code that blocks it.
+    A heartbeat coroutine wakes up every `interval` seconds and records how
+    late it was. A monitor thread watches the heartbeat: once it is more than
+    `threshold` seconds overdue, the loop is stuck in synchronous code, so the
+    thread grabs the loop thread's stack right then. The stall is recorded in
+    `stalls` (the latest `history` of them) when the loop comes back.
+    """
+
+    def __init__(self, interval: float = WATCHDOG_SETTINGS['interval'], threshold: float = WATCHDOG_SETTINGS['threshold'], history: int = WATCHDOG_SETTINGS['history']):
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._beat = time.monotonic()
+        self._captured = None       # (started_at, stack) of the stall in progress
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._loop_thread_id = None
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - before - self.interval)
+            loop_lag_seconds.observe(lag)
+            with self._lock:
+                self._beat = now
+                captured, self._captured = self._captured, None
+            if captured is not None:
+                started_at, stack = captured
+                self.stalls.append(Stall(started_at, lag, stack))
+                loop_stalls.inc()
+                print(f"Event loop blocked for {lag:.2f}s in {stack[-1] if stack else 'unknown code'}")
+
+    def _monitor(self):
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                overdue = time.monotonic() - self._beat - self.interval
+                if overdue < self.threshold or self._captured is not None:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = tuple(collapse_frame(frame).split(";")) if frame is not None else ()
+            del frame
+            with self._lock:
+                # The loop may have come back while the stack was being read
+                if time.monotonic() - self._beat - self.interval >= self.threshold:
+                    self._captured = (time.time() - overdue, stack)
+
+    def recent(self, limit: int = 10) -> list:
+        """The latest stalls, newest first."""
+        return list(self.stalls)[::-1][:limit]
+
+
+loop_watchdog = LoopWatchdog()
@@ -4,21 +4,47 @@ from discord.ext import commands
 from dotenv import load_dotenv
 
 from functions.database import *
+from functions.metrics import metrics_server, end_command
+from functions.watchdog import loop_watchdog
 
 
 load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
 
-bot = commands.Bot(command_prefix='!', intents=discord.Intents.all())
+bot = commands.AutoShardedBot(
+    command_prefix='!',
+    intents=discord.Intents.all(),
+    shard_count=SHARD_SETTINGS['shard_count'],
+    shard_ids=SHARD_SETTINGS['shard_ids']
+)
 
 @bot.event
 async def on_ready():
     print(f"🟩 | Bot loaded as {bot.user.name}")
 
-    setup_tables()
+    loop_watchdog.start()
+
+    await db.setup_tables()
+    await db.create_ticket_tables()
     print(f"🟩 | All tables setup")
 
+    # Data from before per-guild support is stored under guild 0 until a guild adopts it
+    legacy_guild_id = LEGACY_GUILD_ID or (bot.guilds[0].id if len(bot.guilds) == 1 else None)
+    try:
+        # slots.id is the slot's channel, which says which guild it belongs to
+        slot_guilds = {
+            slot[0]: channel.guild.id for slot in await db.get_all_slots()
+            if slot[10] == 0 and (channel := bot.get_channel(slot[0])) is not None and getattr(channel, "guild", None)
+        }
+        adopted = await db.adopt_legacy_rows(legacy_guild_id, slot_guilds)
+        if adopted:
+            print(f"🟩 | Moved {adopted} rows from before per-guild support to their guild")
+    except Exception as e:
+        print(f"🟥 | Failed to adopt data from before per-guild support: {e}")
+    if legacy_guild_id is None:
+        print("🟥 | Set LEGACY_GUILD_ID to adopt points and tickets stored before per-guild support")
+
     await bot.load_extension("extensions.Point")
     await bot.load_extension("extensions.Admin")
     await bot.load_extension("extensions.Ticket")
@@ -27,6 +53,18 @@ async def on_ready():
     await bot.tree.sync()
     print(f"🟩 | Bot tree synced")
 
+    if METRICS_SETTINGS['enabled']:
+        try:
+            await metrics_server.start()
+            print(f"🟩 | Metrics served on http://{metrics_server.host}:{metrics_server.port}/metrics")
+        except OSError as e:
+            print(f"Error starting metrics server: {e}")
+
+
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    end_command(interaction, "ok")
+
 
 if __name__ == "__main__":
     bot.run(BOT_TOKEN)
\ No newline at end of file